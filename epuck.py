@@ -1,10 +1,41 @@
 
-from epuck_interface import EPuckInterface
-from PIL import Image
+from epuck_interface import EPuckInterface, NEAREST
 from epuck_driver import EPuckDriver
-from pyvalid.validators import accepts
-from math import pi
-from bluetooth import discover_devices as discover_bluetooth_devices
+from epuck_session import EPuckSession
+from epuck_validation import accepts
+from math import sqrt, floor
+import epuck_constraints
+import epuck_discovery
+
+# Número máximo de píxeles de las imágenes que puede enviar el firmware del robot
+max_camera_pixels = 1600
+
+# Nombre en el driver de cada tipo de sensor
+driver_sensors = {
+    'prox_sensors': 'proximity',
+    'floor_sensors': 'floor',
+    'light_sensor': 'light',
+    'vision_sensor': 'camera'
+}
+
+
+def negotiate_camera_size(size, max_pixels = max_camera_pixels, max_size = epuck_constraints.camera_resolution):
+    '''
+    Calcula el tamaño de las imágenes que se pedirán a la cámara del robot para obtener imágenes del
+    tamaño indicado.
+    :param size: Tamaño deseado (ancho, alto)
+    :param max_pixels: Número máximo de píxeles de las imágenes de la cámara
+    :param max_size: Resolución (ancho, alto) del sensor de la cámara
+    :return: Devuelve el tamaño (ancho, alto) más grande con la misma relación de aspecto que el indicado y
+    que no supera el número máximo de píxeles. Si el tamaño indicado no lo supera, se devuelve el mismo.
+    '''
+    width, height = size
+    scale = min(sqrt(max_pixels / (width * height)), max_size[0] / width, max_size[1] / height, 1)
+    if scale == 1:
+        return width, height
+    return max(floor(width * scale), 1), max(floor(height * scale), 1)
+
+
 
 class EPuck(EPuckInterface):
     '''
@@ -22,6 +53,8 @@ class EPuck(EPuckInterface):
         si la ID es 250, el dispositivo bluetooth que se intentará buscar tendrá el nombre ePuck_250
         '''
         super().__init__(False, address_or_id)
+        self.id = address_or_id if not isinstance(address_or_id, str) else None
+        self._vision_sensor_image = None
 
 
     '''
@@ -29,17 +62,30 @@ class EPuck(EPuckInterface):
     '''
 
     def init(self, address_or_id):
-        def get_address_by_id(id):
-            devices = dict([(name.lower(), address) for address, name in discover_bluetooth_devices(lookup_names = True, lookup_class = False)])
-            name = 'epuck_{}'.format(id)
-            if not id in devices:
-                raise Exception('Bluetooth device not avaliable')
-            address = devices[name]
-            return address
+        def connect(address):
+            # Si se pierde la conexión, la sesión se restablece automáticamente
+            self.handler = EPuckSession(EPuckDriver(address = address, debug = False))
+            self.handler.connect()
 
-        address = address_or_id if isinstance(address_or_id, str) else get_address_by_id(address_or_id)
-        self.handler = EPuckDriver(address = address, debug = False)
-        self.handler.connect()
+        if isinstance(address_or_id, str):
+            connect(address_or_id)
+        else:
+            # La dirección del robot se obtiene de la caché de direcciones bluetooth. Si no se puede
+            # establecer la conexión con la dirección guardada, puede que ya no sea válida: se vuelve a
+            # buscar. Si la dirección se acaba de buscar (o la búsqueda falla), no se repite la búsqueda
+            cache = epuck_discovery.default_cache
+            cached = cache.is_cached(address_or_id)
+            address = cache.get_address(address_or_id)
+            try:
+                connect(address)
+            except Exception:
+                if not cached:
+                    raise
+                cache.invalidate(address_or_id)
+                connect(cache.get_address(address_or_id))
+        # Los contadores de pasos de los motores se usan para la odometría
+        self.handler.enable('motor_position')
+        self._reconnections = 0
 
 
     def close(self):
@@ -58,7 +104,7 @@ class EPuck(EPuckInterface):
 
 
     def _set_right_motor_speed(self, speed):
-        super()._set_right_motor_speed()
+        super()._set_right_motor_speed(speed)
         # No es necesario hacer nada en este método, los parámetros de los motores
         # se actualizan en el método update
 
@@ -85,31 +131,72 @@ class EPuck(EPuckInterface):
         values = self.handler.get_proximity()
         return values[index]
 
+    def _get_prox_sensors(self):
+        return self.handler.get_proximity()
+
 
     '''
     Implementación del método para muestrear el sensor de visión
     '''
-    def _set_vision_sensor_params(self, mode = 'RGB', size = (40, 40), zoom = 1, resample = Image.NEAREST):
+    def _set_vision_sensor_params(self, mode = 'RGB', size = (40, 40), zoom = 1, resample = NEAREST):
         super()._set_vision_sensor_params(mode, size, zoom, resample)
+        self._configure_camera()
 
-        # TODO
-        raise NotImplementedError()
+    def _configure_camera(self):
+        '''
+        Configura la cámara del robot con los parámetros del sensor de visión. Se usa el modo más rápido
+        posible: escala de grises si se piden imágenes en blanco y negro o en escala de grises (1 byte por
+        píxel en vez de 2) y la mayor resolución que permite el firmware con la misma relación de aspecto.
+        Las imágenes se convierten y redimensionan después en el host.
+        '''
+        mode, size, zoom, resample = self._vision_sensor_params
 
+        grey_scale = mode in ('L', '1')
+        width, height = negotiate_camera_size(size)
+        self.handler.set_camera_parameters('GREY_SCALE' if grey_scale else 'RGB_365', width, height, zoom)
+
+        # Mientras se recibe una imagen no se actualizan el resto de sensores, por lo que por defecto se pide
+        # una imagen por segundo. Puede pedirse con más frecuencia indicando la antigüedad máxima de las
+        # imágenes (ver set_max_age): hasta unas 8 imágenes por segundo en escala de grises y 4 en color
+        max_age = self.get_max_age('vision_sensor')
+        if max_age is None:
+            self.handler.set_camera_fps(1)
+        else:
+            self.handler.set_max_age('camera', max_age)
 
     def _get_vision_sensor(self):
         super()._get_vision_sensor()
         mode, size, zoom, resample = self._vision_sensor_params
-        # TODO
-        raise NotImplementedError()
+
+        image = self.handler.get_image()
+        if image is None:
+            return None
+
+        # La imagen convertida se guarda hasta que se recibe la siguiente imagen de la cámara
+        if self._vision_sensor_image is not None and self._vision_sensor_image[0] is image and \
+                self._vision_sensor_image[1] == self._vision_sensor_params:
+            return self._vision_sensor_image[2]
+
+        result = image
+        if result.mode != mode:
+            result = result.convert(mode)
+        if result.size != tuple(size):
+            result = result.resize(size, resample)
+
+        self._vision_sensor_image = (image, self._vision_sensor_params, result)
+        return result
 
 
     '''
     Métodos para muestrear los sensores del suelo
     '''
+    def _get_floor_sensors(self):
+        return self.handler.get_floor_sensors()
+
     def _get_floor_sensor(self, index):
         super()._get_floor_sensor(index)
 
-        values = dict(zip(['left', 'center', 'right'], self.handler.get_floor_sensors()))
+        values = dict(zip(['left', 'middle', 'right'], self.handler.get_floor_sensors()))
         return values[index]
 
 
@@ -130,6 +217,23 @@ class EPuck(EPuckInterface):
         # TODO
         raise NotImplementedError()
 
+    '''
+    Instantes de adquisición y antigüedad máxima de las lecturas
+    '''
+    def _get_reading_timestamp(self, sensor):
+        # El driver estima el instante en el que el robot muestrea cada sensor (punto medio entre la petición
+        # y la respuesta)
+        timestamp = self.handler.get_timestamp(driver_sensors[sensor]) if sensor is not None else None
+        return timestamp if timestamp is not None else super()._get_reading_timestamp(sensor)
+
+    def _set_max_age(self, sensor, max_age):
+        # Solo se piden al robot las lecturas que han caducado
+        if sensor == 'vision_sensor':
+            self._configure_camera()
+        else:
+            self.handler.set_max_age(driver_sensors[sensor], max_age)
+
+
     '''
     Actualiza la información de los sensores y hace efectivos los cambios en los actuadores
     (motores / leds)
@@ -137,12 +241,26 @@ class EPuck(EPuckInterface):
     def update(self):
         super().update()
 
-        # Establecemos la velocidad de los motores.
-        steps_per_radian = .002 * pi
-        self.handler.set_motors_speed(l_motor = self.left_motor.speed * steps_per_radian,
-                                      r_motor = self.right_motor.speed * steps_per_radian)
+        # Establecemos la velocidad de los motores (en pasos / segundo)
+        steps_per_radian = epuck_constraints.motor_steps_per_radian
+        left, right = self.motors.speeds
+        self.handler.set_motors_speed(l_motor = left * steps_per_radian, r_motor = right * steps_per_radian)
+
+        if not self.handler.step():
+            # Se ha perdido la conexión o se está recibiendo una imagen: no hay lecturas nuevas, se mantienen
+            # los últimos valores de los sensores
+            return
+
+        if self._reconnections != self.handler.reconnections:
+            # Los contadores de pasos de los motores se han reiniciado con el robot
+            self._reconnections = self.handler.reconnections
+            self.odometry.reset(*self.odometry.pose)
 
-        self.handler.step()
+        # Actualizamos la odometría con los nuevos contadores de pasos de los motores, en el instante en el
+        # que se leyeron (no en el actual)
+        self.odometry.update_steps(*self.handler.get_motor_position(),
+                                   timestamp = self.handler.get_timestamp('motor_position'))
+        self._updated()
 
 
     '''
@@ -166,6 +284,7 @@ class EPuck(EPuckInterface):
         super()._enable_vision_sensor(enabled)
         if enabled:
             self.handler.enable('camera')
+            self._configure_camera()
         else:
             self.handler.disable('camera')
 
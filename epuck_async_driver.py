@@ -0,0 +1,369 @@
+'''
+Versión asíncrona (asyncio) de la clase EPuckDriver. Permite controlar varios robots desde un
+único bucle de eventos sin necesidad de crear un hilo por cada robot.
+e.g:
+async def main():
+    drivers = [AsyncEPuckDriver(address) for address in addresses]
+    await asyncio.gather(*[driver.connect() for driver in drivers])
+    while True:
+        await asyncio.gather(*[driver.step() for driver in drivers])
+
+La codificación y decodificación de los mensajes del protocolo es la misma que la de EPuckDriver, solo
+se sustituyen los métodos que hacen operaciones de E/S por corrutinas.
+'''
+
+import asyncio
+from epuck_driver import EPuckDriver
+from epuck_transport import BluetoothTransport
+
+
+class AsyncEPuckDriver(EPuckDriver):
+    '''
+    Driver asíncrono del robot e-puck. Los métodos connect, close, disconnect, reset, stop, step,
+    send_and_receive, enable y get_sercom_version son corrutinas. El resto de métodos (los que solo
+    modifican o consultan el estado local del driver) son los mismos que los de EPuckDriver.
+    El transporte debe proporcionar un socket de la librería estándar (atributo socket)
+    '''
+
+    def __init__(self, address = None, debug = False, pipelined = True, transport = None, camera_fps = 1, timeout = .5):
+        '''
+        Inicializa la instancia.
+        :param address: Dirección MAC del robot (si no se indica el transporte)
+        :param debug: Muestra información de depuración
+        :param pipelined: Lee todos los sensores en modo binario con un único mensaje
+        :param transport: Transporte a usar. Por defecto se usan los sockets bluetooth RFCOMM de la librería
+        estándar
+        :param camera_fps: Número de imágenes por segundo que se leerán de la cámara
+        :param timeout: Tiempo máximo de espera inicial (en segundos) de las respuestas del robot. Se adapta
+        al RTT de la conexión
+        '''
+        if transport is None:
+            transport = BluetoothTransport(address, native = True)
+        super().__init__(address, debug, pipelined, transport, camera_fps, timeout)
+
+
+    '''
+    Métodos de E/S
+    '''
+
+    async def _recv(self, n = 4096, sent = None, timeout = None):
+        if not self.conexion_status:
+            raise Exception('There is not connection')
+
+        loop = asyncio.get_running_loop()
+        try:
+            timeout = self.rtt.timeout if timeout is None else timeout
+            line = await asyncio.wait_for(loop.sock_recv(self.transport.socket, n), timeout)
+            self.messages_received += 1
+            if sent is not None:
+                self.rtt.add(loop.time() - sent)
+        except (IOError, asyncio.TimeoutError) as e:
+            txt = 'Bluetooth communication problem: ' + str(e)
+            self._debug(txt)
+            raise Exception(txt)
+        else:
+            return line
+
+    async def _recv_into(self, buffer, sent = None):
+        if not self.conexion_status:
+            raise Exception('There is not connection')
+
+        loop = asyncio.get_running_loop()
+        size = len(buffer)
+        received = 0
+        try:
+            while received < size:
+                n = await asyncio.wait_for(loop.sock_recv_into(self.transport.socket, buffer[received:]), self.rtt.timeout)
+                if n == 0:
+                    raise IOError('Connection closed by the robot')
+                if received == 0 and sent is not None:
+                    self.rtt.add(loop.time() - sent)
+                received += n
+                self.messages_received += 1
+        except (IOError, asyncio.TimeoutError) as e:
+            txt = 'Bluetooth communication problem: ' + str(e)
+            self._debug(txt)
+            raise Exception(txt)
+        else:
+            return buffer
+
+    async def _send(self, message):
+        if not self.conexion_status:
+            raise Exception('There is not connection')
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.sock_sendall(self.transport.socket, message)
+            self.messages_sent += 1
+        except Exception as e:
+            self._debug('Send problem:', e)
+            return -1
+        else:
+            return len(message)
+
+    async def _flush_input(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while await asyncio.wait_for(loop.sock_recv(self.transport.socket, 4096), self.rtt.timeout):
+                pass
+        except (IOError, asyncio.TimeoutError):
+            pass
+
+    async def _timed_out(self):
+        self._debug('Communication timeout, retrying')
+        self.rtt.timed_out()
+        await self._flush_input()
+
+    async def _read_image(self):
+        msg, size = self._image_request()
+        requested = asyncio.get_running_loop().time()
+        n = await self._send(msg)
+        self._debug("Reading Image: sending " + repr(msg) + " and " + str(n) + " bytes")
+        self._start_frame(requested)
+        await self._drain_frame()
+
+    async def _drain_frame(self, block = False):
+        transit = self._frame_transit
+        if transit is None:
+            return True
+
+        buffer = transit[0]
+        sock = self.transport.socket
+        loop = asyncio.get_running_loop()
+        try:
+            while self._frame_transit is not None:
+                if block:
+                    n = await asyncio.wait_for(loop.sock_recv_into(sock, buffer[transit[2]:]), self.rtt.timeout)
+                else:
+                    # El socket no es bloqueante: se leen los bytes que ya han llegado
+                    n = sock.recv_into(buffer[transit[2]:])
+                if n == 0:
+                    raise IOError('Connection closed by the robot')
+                self.messages_received += 1
+                self._frame_progress(n)
+
+        except BlockingIOError as e:
+            if self._frame_stalled():
+                self._debug('Problem receiving an image: ', e)
+                self._frame_lost()
+                await self._flush_input()
+                return True
+            return False
+
+        except (IOError, asyncio.TimeoutError) as e:
+            self._debug('Problem receiving an image: ', e)
+            self._frame_lost()
+            await self._flush_input()
+
+        return True
+
+    async def _refresh_camera_parameters(self):
+        try:
+            reply = await self.send_and_receive("I")
+        except:
+            return False
+        else:
+            self._decode_camera_parameters(reply)
+
+    async def _write_actuators(self):
+        binary, binary_commands, ascii = self._actuators_messages()
+
+        if binary is not None:
+            n = await self._send(binary)
+            self._debug('Binary message sent of [' + str(n) + '] bytes: ' + repr(binary))
+            self._actuators_sent(binary_commands, n == len(binary))
+
+        for slot, command, msg in ascii:
+            reply = await self.send_and_receive(msg)
+            self._actuators_sent({slot: command}, reply is not None)
+            if self._actuator_acknowledged(reply):
+                await self._refresh_camera_parameters()
+
+    async def _read_sensors(self, image = False):
+        binary_sensors, ascii_sensors = self._sensors_requests()
+        if self._max_ages:
+            binary_sensors, ascii_sensors = self._stale_sensors(binary_sensors, ascii_sensors)
+
+        loop = asyncio.get_running_loop()
+        for s in ascii_sensors:
+            requested = loop.time()
+            reply = await self.send_and_receive(s)
+            self._decode_ascii_sensor(reply, (requested + loop.time()) / 2)
+
+        if self.pipelined:
+            if binary_sensors or image:
+                await self._read_binary_sensors(binary_sensors, image)
+        else:
+            for sensor in binary_sensors:
+                await self._read_binary_sensors([sensor])
+            if image:
+                await self._read_image()
+
+    async def _read_binary_sensors(self, binary_sensors, image = False):
+        message, size = self._binary_request(binary_sensors, image)
+        stats = self._binary_stats(binary_sensors)
+        loop = asyncio.get_running_loop()
+
+        # Se hacen 4 intentos antes de desistir. Solo el primero se usa para estimar el RTT
+        tries = 1
+        start = loop.time()
+        while True:
+            self._debug('Sending binary message: ', repr(message))
+            requested = loop.time()
+            sent = requested if tries == 1 else None
+            await self._send(message)
+            for command, n in stats:
+                command.requested(1) if tries == 1 else command.retried(1)
+
+            try:
+                if size > 0:
+                    reply = await self._recv_into(self._reply_buffer(size), sent)
+                    self._decode_binary_replies(binary_sensors, reply, (requested + loop.time()) / 2)
+                    sent = None
+
+                latency = loop.time() - start
+                for command, n in stats:
+                    command.replied(n, latency)
+
+                # La imagen llega después de las respuestas de los sensores, se recibe en los siguientes pasos
+                if image:
+                    self._start_frame(requested)
+                    await self._drain_frame()
+                return
+
+            except Exception as e:
+                for command, n in stats:
+                    command.timed_out()
+                if tries >= 4:
+                    for command, n in stats:
+                        command.failed()
+                    raise e
+                tries += 1
+                await self._timed_out()
+
+
+    '''
+    Métodos públicos
+    '''
+
+    async def connect(self):
+        if self.conexion_status:
+            self._debug('Already connected')
+            return False
+        try:
+            # La conexión bluetooth es bloqueante, se establece en un hilo auxiliar
+            await asyncio.get_running_loop().run_in_executor(None, self.transport.connect)
+            self.transport.socket.setblocking(False)
+
+        except Exception as e:
+            txt = 'Connection problem: \n' + str(e)
+            self._debug(txt)
+            raise Exception(txt)
+
+        self.conexion_status = True
+        self._frame_transit = None
+        self._debug("Connected")
+
+        await self.reset()
+        return True
+
+    async def disconnect(self):
+        return await self.close()
+
+    async def close(self):
+        if self.conexion_status:
+            try:
+                await self.stop()
+                self.transport.close()
+                self.conexion_status = False
+            except Exception as e:
+                raise Exception('Closing connection problem: \n' + str(e))
+            else:
+                return 0
+
+    async def send_and_receive(self, msg, timeout = None):
+        if not self.conexion_status:
+            raise Exception('There is not connection')
+
+        # La respuesta llegaría después de la imagen que se está recibiendo
+        await self._drain_frame(block = True)
+
+        message, lines = self._ascii_request(msg)
+        stats = self.stats.ascii_command(message[0])
+        loop = asyncio.get_running_loop()
+
+        # Se hacen 5 intentos antes de desistir. Mientras se espera la respuesta, el bucle de eventos
+        # puede atender al resto de robots
+        tries = 1
+        start = loop.time()
+        while tries < 5:
+            sent = loop.time() if tries == 1 and timeout is None else None
+            bytes = await self._send(message.encode('ascii'))
+            stats.requested(len(message)) if tries == 1 else stats.retried(len(message))
+            self._debug('Message sent:', repr(message))
+            self._debug('Bytes sent:', bytes)
+
+            try:
+                reply = ''
+                while reply.count('\n') < lines:
+                    reply += (await self._recv(sent = sent, timeout = timeout)).decode('latin-1')
+                    reply = self._filter_ascii_reply(message, reply)
+                    sent = None
+                self._debug('Message received: ', reply)
+                stats.replied(len(reply), loop.time() - start)
+                return reply.replace('\r\n' ,'')
+
+            except Exception as e:
+                tries += 1
+                stats.timed_out()
+                await self._timed_out()
+
+        stats.failed()
+
+    async def get_sercom_version(self):
+        return await self.send_and_receive("v")
+
+    async def enable(self, *sensors):
+        if "camera" in sensors and not self._cam_enable:
+            # Leemos los parámetros de la cámara antes de activarla
+            await self._refresh_camera_parameters()
+            self._cam_enable = True
+        return super().enable(*sensors)
+
+    async def calibrate_proximity_sensors(self):
+        reply = await self.send_and_receive("k", timeout = 25)
+        return reply[1] == "k"
+
+    async def reset(self):
+        if not self.conexion_status:
+            raise Exception('There is not connection')
+
+        msg = await self.send_and_receive("R")
+        self._debug(msg)
+
+        self._actuators_written.clear()
+        return True
+
+    async def stop(self):
+        if not self.conexion_status:
+            raise Exception('There is not connection')
+
+        reply = await self.send_and_receive("S")
+        self._debug(reply)
+
+        self._actuators_written.clear()
+        return reply == "s"
+
+    async def step(self):
+        if not self.conexion_status:
+            raise Exception('There is not connection')
+
+        await self._write_actuators()
+
+        # Mientras se recibe una imagen, los sensores mantienen sus últimos valores (ver EPuckDriver.step)
+        if not await self._drain_frame():
+            return False
+
+        # Las imágenes se solicitan junto con los sensores
+        await self._read_sensors(self._camera_due())
+        return True
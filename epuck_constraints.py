@@ -16,3 +16,49 @@ wheels_radius = wheels_diameter / 2
 from math import pi
 max_motor_speed = 2 * pi
 
+
+# Número de pasos por vuelta de los motores paso a paso de las ruedas. El contador de pasos de cada motor
+# es un entero de 16 bits
+motor_steps_per_revolution = 1000
+motor_steps_per_radian = motor_steps_per_revolution / (2 * pi)
+motor_steps_counter_size = 2 ** 16
+
+# Resolución (ancho, alto) del sensor de la cámara
+camera_resolution = (640, 480)
+
+
+'''
+Cinemática del robot (modelo diferencial). Las funciones reciben números o arrays de NumPy; en este último
+caso se calculan todos los elementos a la vez.
+'''
+
+def wheels_speeds(v, w):
+    '''
+    Calcula la velocidad de las ruedas a partir de la velocidad del robot.
+    :param v: Velocidad lineal en metros / segundo
+    :param w: Velocidad angular en radianes / segundo (en sentido antihorario)
+    :return: Devuelve una tupla con la velocidad de las ruedas izquierda y derecha en radianes / segundo
+    '''
+    return (v - w * body_radius) / wheels_radius, (v + w * body_radius) / wheels_radius
+
+def unicycle_speeds(left, right):
+    '''
+    Calcula la velocidad del robot a partir de la velocidad de las ruedas.
+    :param left: Velocidad de la rueda izquierda en radianes / segundo
+    :param right: Velocidad de la rueda derecha en radianes / segundo
+    :return: Devuelve una tupla con la velocidad lineal (metros / segundo) y angular (radianes / segundo)
+    '''
+    return (left + right) * wheels_radius / 2, (right - left) * wheels_radius / (2 * body_radius)
+
+def saturate_wheels_speeds(left, right):
+    '''
+    Limita la velocidad de las ruedas a max_motor_speed. Si alguna la supera, se reducen las dos en la misma
+    proporción, de forma que el robot mantiene la curvatura de su trayectoria.
+    :param left: Velocidad de la rueda izquierda en radianes / segundo
+    :param right: Velocidad de la rueda derecha en radianes / segundo
+    :return: Devuelve una tupla con las velocidades limitadas
+    '''
+    import numpy as np
+
+    scale = np.maximum(np.maximum(np.abs(left), np.abs(right)) / max_motor_speed, 1)
+    return np.clip(left / scale, -max_motor_speed, max_motor_speed), np.clip(right / scale, -max_motor_speed, max_motor_speed)
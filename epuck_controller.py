@@ -1,9 +1,8 @@
 
 from time import sleep
-from time import clock
-from pyvalid.validators import accepts
+from time import perf_counter as clock
+from epuck_validation import accepts
 from epuck_interface import EPuckInterface
-from epuck_streamer import EPuckStreamer
 
 class EPuckController:
     '''
@@ -42,7 +41,11 @@ class EPuckController:
         self._update_time = 0
         self._step_time = float('inf')
 
-        self.streamer = EPuckStreamer(self, address = 'localhost', port = stream_port) if enable_streaming else None
+        self.streamer = None
+        if enable_streaming:
+            # El servidor de streaming solo se importa si se usa
+            from epuck_streamer import EPuckStreamer
+            self.streamer = EPuckStreamer(self, address = 'localhost', port = stream_port)
 
     def run(self):
         '''
@@ -0,0 +1,150 @@
+'''
+Este módulo resuelve las direcciones MAC de los robots e-puck a partir de sus IDs. La búsqueda de
+dispositivos bluetooth tarda varios segundos, por lo que las direcciones encontradas se guardan en una
+caché en disco con un tiempo de validez. Con una única búsqueda se resuelven las IDs de todos los robots
+que estén al alcance.
+e.g:
+cache = DiscoveryCache()
+addresses = cache.get_addresses([250, 251, 252])
+'''
+
+import os
+from threading import RLock
+from time import time
+
+
+def discover_devices():
+    '''
+    Busca los dispositivos bluetooth que están al alcance.
+    :return: Devuelve una lista de tuplas (dirección, nombre)
+    '''
+    # PyBluez solo se importa cuando es necesario hacer una búsqueda
+    from bluetooth import discover_devices as discover_bluetooth_devices
+    return discover_bluetooth_devices(lookup_names = True, lookup_class = False)
+
+
+
+class DiscoveryCache:
+    '''
+    Caché persistente de las direcciones MAC de los robots e-puck indexadas por su ID. Se supone que el
+    dispositivo bluetooth del robot con la ID 250 tiene el nombre ePuck_250 (la comparación de nombres no
+    distingue mayúsculas y minúsculas).
+    La caché puede usarse desde varios hilos a la vez: si varios hilos necesitan hacer una búsqueda, solo
+    se hace una.
+    '''
+
+    def __init__(self, path = None, ttl = 7 * 24 * 3600, name_format = 'epuck_{}', discover = discover_devices):
+        '''
+        Inicializa la instancia.
+        :param path: Ruta del fichero de la caché. Por defecto es ~/.epuck_discovery.json
+        :param ttl: Tiempo de validez (en segundos) de las direcciones guardadas. Por defecto es una semana
+        :param name_format: Formato del nombre del dispositivo bluetooth de cada robot a partir de su ID
+        :param discover: Función que busca los dispositivos bluetooth al alcance y devuelve una lista de
+        tuplas (dirección, nombre)
+        '''
+        self.path = path if path is not None else os.path.join(os.path.expanduser('~'), '.epuck_discovery.json')
+        self.ttl = ttl
+        self.name_format = name_format
+        self.discover = discover
+        self._lock = RLock()
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            # json solo se importa si se usa la caché
+            import json
+            try:
+                with open(self.path, 'r') as file:
+                    self._entries = json.load(file)
+            except (IOError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        # El fichero se reemplaza de forma atómica para que otros procesos no lean un fichero incompleto
+        import json
+        try:
+            tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+            with open(tmp_path, 'w') as file:
+                json.dump(self._entries, file, indent = 1, sort_keys = True)
+            os.replace(tmp_path, self.path)
+        except IOError:
+            pass
+
+    def _lookup(self, id):
+        entry = self._load().get(str(id))
+        if entry is None or time() - entry['timestamp'] > self.ttl:
+            return None
+        return entry['address']
+
+    def _refresh(self):
+        '''
+        Busca los dispositivos bluetooth al alcance y guarda en la caché las direcciones de todos los
+        robots e-puck encontrados.
+        '''
+        prefix = self.name_format.format('').lower()
+        now = time()
+        entries = self._load()
+        for address, name in self.discover():
+            name = name.lower()
+            if name.startswith(prefix) and len(name) > len(prefix):
+                entries[name[len(prefix):]] = {'address': address, 'timestamp': now}
+        self._save()
+
+    def get_addresses(self, ids):
+        '''
+        Obtiene las direcciones MAC de varios robots. Si alguna de ellas no está en la caché (o ha caducado),
+        se hace una única búsqueda de dispositivos bluetooth.
+        :param ids: Lista de IDs de los robots
+        :return: Devuelve una lista con las direcciones MAC de los robots, en el mismo orden.
+        Lanza una excepción si algún robot no se ha encontrado.
+        '''
+        with self._lock:
+            if any(self._lookup(id) is None for id in ids):
+                self._refresh()
+
+            addresses = [self._lookup(id) for id in ids]
+            missing = [str(id) for id, address in zip(ids, addresses) if address is None]
+            if missing:
+                raise Exception('Bluetooth device not avaliable ({})'.format(', '.join(missing)))
+            return addresses
+
+    def is_cached(self, id):
+        '''
+        Comprueba si la dirección de un robot está en la caché (y no ha caducado), es decir, si get_address()
+        la devolverá sin hacer una búsqueda.
+        :param id: ID del robot
+        :return: Devuelve True si la dirección está en la caché
+        '''
+        with self._lock:
+            return self._lookup(id) is not None
+
+    def get_address(self, id):
+        '''
+        Obtiene la dirección MAC de un robot.
+        :param id: ID del robot
+        :return: Devuelve la dirección MAC del robot. Lanza una excepción si no se ha encontrado
+        '''
+        return self.get_addresses([id])[0]
+
+    def invalidate(self, id):
+        '''
+        Elimina de la caché la dirección de un robot. Debe invocarse si no se puede establecer la conexión
+        con la dirección guardada (por ejemplo, si se ha cambiado el módulo bluetooth del robot)
+        :param id: ID del robot
+        '''
+        with self._lock:
+            if self._load().pop(str(id), None) is not None:
+                self._save()
+
+    def clear(self):
+        '''
+        Elimina todas las direcciones de la caché.
+        '''
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+
+# Caché usada por defecto por la clase EPuck
+default_cache = DiscoveryCache()
@@ -54,10 +54,13 @@
 # Modified by Vykstorm to fit pyepuck library and python3
 
 import sys  # System library
-import bluetooth  # Used for communications
 import time  # Used for image capture process
 import struct  # Used for Big-Endian messages
-from PIL import Image  # Used for the pictures of the camera
+import socket  # Used for the timeouts of the transports
+from epuck_lazy import lazy_import  # NumPy and PIL are loaded the first time they're used
+np = lazy_import('numpy')  # Used for decoding the pictures of the camera
+Image = lazy_import('PIL.Image')  # Used for the pictures of the camera
+from epuck_transport import BluetoothTransport, RecordingTransport  # Used for communications
 
 
 __version__ = "1.2.2"
@@ -89,6 +92,78 @@ DIC_SENSORS = {
     "microphone": "u"
 }
 
+class SensorCodec:
+    """
+    Describes how a sensor is read in binary mode: the opcode of the request,
+    the format of the reply (precompiled) and the attribute of the driver
+    where the values are saved
+    """
+
+    __slots__ = ('opcode', 'request', 'struct', 'size', 'slot')
+
+    def __init__(self, opcode, fmt, slot):
+        """
+        :param opcode: Char of the binary request, it's sent as a negative byte
+        :type opcode: String
+        :param fmt: Format of the reply, see the 'struct' module
+        :type fmt: String
+        :param slot: Name of the attribute of EPuckDriver where the values are saved
+        :type slot: String
+        """
+        self.opcode = opcode
+        self.request = struct.pack(">b", - ord(opcode))
+        self.struct = struct.Struct(fmt)
+        self.size = self.struct.size
+        self.slot = slot
+
+# Sensors that can be read in binary mode, indexed by the values of
+# DIC_SENSORS. The robot sends the values in little endian
+SENSOR_CODECS = {
+    "a": SensorCodec("a", "<HHH", "_accelerometer"),
+    "A": SensorCodec("A", "<III", "_accelerometer"),  # Filtered accelerometer
+    "n": SensorCodec("N", "<HHHHHHHH", "_proximity"),
+    "m": SensorCodec("M", "<HHH", "_floor_sensors"),
+    "q": SensorCodec("Q", "<HH", "_motor_position"),
+    "o": SensorCodec("O", "<HHHHHHHH", "_light_sensor"),
+    "u": SensorCodec("u", "<HHH", "_microphone"),
+    "e": SensorCodec("E", "<HH", "_motor_speed")
+}
+
+
+# Attributes of the driver where the values of the sensors that are not
+# read in binary mode are saved
+SENSOR_SLOTS = {
+    "c": "_selector",
+    "i": "_frame"
+}
+
+
+# Actuators commands that set a state (motors speed, leds and camera
+# parameters). They are not sent again if they didn't change since the last
+# time. Playing a sound or setting the motors position are not idempotent
+STATE_ACTUATORS = ('D', 'L', 'J')
+
+
+def register_sensor(name, key, opcode, fmt, slot = None):
+    """
+    Register a new sensor of the firmware that can be read in binary mode.
+    Then it can be enabled with 'EPuckDriver.enable(name)' and its values
+    are read with 'EPuckDriver.get_sensor(name)'
+
+    :param name: Name of the sensor, it's added to DIC_SENSORS
+    :type name: String
+    :param key: Key of the sensor in DIC_SENSORS and SENSOR_CODECS
+    :type key: String
+    :param opcode: Char of the binary request
+    :type opcode: String
+    :param fmt: Format of the reply, see the 'struct' module
+    :type fmt: String
+    :param slot: Attribute of the driver where the values are saved, '_' + name by default
+    :type slot: String
+    """
+    DIC_SENSORS[name] = key
+    SENSOR_CODECS[key] = SensorCodec(opcode, fmt, slot if slot is not None else '_' + name)
+
 # You have to use the keys of this dictionary for indicate the operating
 # mode of the camera
 CAM_MODE = {
@@ -101,12 +176,238 @@ CAM_MODE = {
 # You can use three diferents Zoom in the camera
 CAM_ZOOM = (1, 4, 8)
 
+# Lookup table from RGB565 pixels to RGB888, built the first time it's used
+_RGB565_TABLE = None
+
+
+def decode_frame(buffer, mode, width, height):
+    """
+    Decode the reply of an image request into a NumPy array. The robot sends
+    the image rotated 180 degrees, it's returned as a flipped view, so no
+    copies are made for grey scale images and only one for RGB images
+
+    :param buffer: Reply received from the robot ("mode", "width", "height"
+        and the pixels)
+    :type buffer: Buffer
+    :param mode: Camera mode, one of the values of CAM_MODE
+    :type mode: int
+    :param width: Width of the image
+    :type width: int
+    :param height: Height of the image
+    :type height: int
+    :return: Array of shape (height, width) for grey scale images or
+        (height, width, 3) for RGB images, with dtype uint8. It's read only
+    :rtype: numpy.ndarray
+    """
+    global _RGB565_TABLE
+
+    if mode == CAM_MODE["GREY_SCALE"]:
+        # 1 byte per pixel. This is a view of the buffer
+        frame = np.frombuffer(buffer, np.uint8, width * height, 3).reshape(height, width)
+    else:
+        # 2 bytes per pixel, RGB565 in big endian
+        if _RGB565_TABLE is None:
+            pixels = np.arange(1 << 16, dtype = np.uint32)
+            _RGB565_TABLE = np.stack([((pixels >> 11) & 31) * 255 // 31,
+                                      ((pixels >> 5) & 63) * 255 // 63,
+                                      (pixels & 31) * 255 // 31], axis = -1).astype(np.uint8)
+        pixels = np.frombuffer(buffer, '>u2', width * height, 3).reshape(height, width)
+        frame = _RGB565_TABLE[pixels]
+
+    frame = frame[::-1, ::-1]
+    frame.flags.writeable = False
+    return frame
+
+
+class RTTEstimator:
+    """
+    Round trip time estimator of a connection (as TCP does, RFC 6298). It
+    keeps a smoothed RTT and its variance, and computes from them the time
+    to wait for a reply before retrying. Each timeout doubles this time
+    (exponential backoff) until a new RTT sample is added
+    """
+
+    def __init__(self, initial = 0.5, min_timeout = 0.05, max_timeout = 10, alpha = 0.125, beta = 0.25, k = 4):
+        """
+        :param initial: Timeout used until the first RTT sample, in seconds
+        :type initial: float
+        :param min_timeout: Lower bound of the timeout, in seconds
+        :type min_timeout: float
+        :param max_timeout: Upper bound of the timeout, in seconds
+        :type max_timeout: float
+        :param alpha: Gain of the smoothed RTT
+        :type alpha: float
+        :param beta: Gain of the RTT variance
+        :type beta: float
+        :param k: Number of deviations added to the smoothed RTT
+        :type k: float
+        """
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.alpha = alpha
+        self.beta = beta
+        self.k = k
+
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial
+        self.backoff = 1
+        self.samples = 0
+
+    def add(self, rtt):
+        """
+        Add a RTT sample. Samples of retried requests should not be added,
+        as it's not known which request is being replied
+
+        :param rtt: Time between the request and the first byte of the reply, in seconds
+        :type rtt: float
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+
+        self.rto = min(max(self.srtt + self.k * self.rttvar, self.min_timeout), self.max_timeout)
+        self.backoff = 1
+        self.samples += 1
+
+    def timed_out(self):
+        """
+        Called when a reply is not received in time. The timeout is doubled
+        """
+        if self.rto * self.backoff < self.max_timeout:
+            self.backoff *= 2
+
+    @property
+    def timeout(self):
+        """
+        :return: Current timeout, in seconds
+        :rtype: float
+        """
+        return min(self.rto * self.backoff, self.max_timeout)
+
+
+class CommandStats:
+    """
+    Statistics of a command of the protocol: number of requests, bytes sent
+    and received, retries, timeouts and a histogram of the latencies (time
+    between the request and the end of the reply)
+    """
+
+    # The histogram has a bucket for every power of 2 microseconds
+    BUCKETS = 25
+
+    __slots__ = ('count', 'bytes_out', 'bytes_in', 'replies', 'retries', 'timeouts', 'failures',
+                 'latency_total', 'latency_max', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.replies = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.histogram = [0] * self.BUCKETS
+
+    def requested(self, n):
+        self.count += 1
+        self.bytes_out += n
+
+    def retried(self, n):
+        self.retries += 1
+        self.bytes_out += n
+
+    def timed_out(self):
+        self.timeouts += 1
+
+    def failed(self):
+        self.failures += 1
+
+    def replied(self, n, latency):
+        self.replies += 1
+        self.bytes_in += n
+        self.latency_total += latency
+        if latency > self.latency_max:
+            self.latency_max = latency
+        self.histogram[min(int(latency * 1000000).bit_length(), self.BUCKETS - 1)] += 1
+
+    def as_dict(self):
+        """
+        :return: The statistics. The histogram is a list of (upper bound of
+            the bucket in seconds, number of replies) of the non empty buckets
+        :rtype: Dictionary
+        """
+        return {
+            'count': self.count,
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'retries': self.retries,
+            'timeouts': self.timeouts,
+            'failures': self.failures,
+            'latency_mean': self.latency_total / self.replies if self.replies > 0 else None,
+            'latency_max': self.latency_max if self.replies > 0 else None,
+            'histogram': [((1 << bucket) / 1000000, n) for bucket, n in enumerate(self.histogram) if n > 0]
+        }
+
+
+class LinkStats:
+    """
+    Statistics of the commands sent to the robot, indexed by their opcode
+    (binary commands) or by their first character (Ascii commands). It only
+    takes a few integer operations per command, so it's always enabled.
+    The commands of a pipelined request share the latency of the request
+    """
+
+    def __init__(self):
+        self.binary = {}
+        self.ascii = {}
+
+    def binary_command(self, opcode):
+        """
+        :return: The statistics of a binary command
+        :rtype: CommandStats
+        """
+        stats = self.binary.get(opcode)
+        if stats is None:
+            stats = self.binary[opcode] = CommandStats()
+        return stats
+
+    def ascii_command(self, command):
+        """
+        :return: The statistics of an Ascii command
+        :rtype: CommandStats
+        """
+        stats = self.ascii.get(command)
+        if stats is None:
+            stats = self.ascii[command] = CommandStats()
+        return stats
+
+    def snapshot(self):
+        """
+        :return: A copy of the statistics, {'binary': {opcode: stats}, 'ascii': {command: stats}}
+        :rtype: Dictionary
+        """
+        return {
+            'binary': dict((opcode, stats.as_dict()) for opcode, stats in self.binary.items()),
+            'ascii': dict((command, stats.as_dict()) for command, stats in self.ascii.items())
+        }
+
+    def reset(self):
+        self.binary.clear()
+        self.ascii.clear()
+
+
 class EPuckDriver:
     """
     This class represent an ePuck object
     """
 
-    def __init__(self, address, debug = False):
+    def __init__(self, address = None, debug = False, pipelined = True, transport = None, camera_fps = 1, timeout = 0.5, capture = None):
         """
         Constructor process
 
@@ -114,6 +415,24 @@ class EPuckDriver:
         :type	address: MAC Address
         :param 	debug: If you want more verbose information, useful for debugging
         :type	debug: Boolean
+        :param 	pipelined: If True, all the sensors available in binary mode are
+            requested with a single message and their replies are read at once
+            (one round trip per 'step()' instead of one per sensor)
+        :type	pipelined: Boolean
+        :param 	transport: Channel used to talk with the robot's firmware. If it is
+            not indicated, a bluetooth connection with the given address is used
+        :type	transport: epuck_transport.Transport
+        :param 	camera_fps: Target frame rate of the camera (images per second).
+            The images are requested along with the sensors and received in
+            the following steps, 'step()' doesn't wait for them
+        :type	camera_fps: float
+        :param 	timeout: Initial timeout of the replies, in seconds. It's adapted
+            to the round trip time of the connection, see 'get_rtt()'
+        :type	timeout: float
+        :param 	capture: Path of a capture file. If it is indicated, all the
+            bytes sent and received are saved there with their timestamps, so
+            the session can be replayed later with 'ReplayTransport'
+        :type	capture: String
 
         :return: ePuck object
         """
@@ -123,10 +442,15 @@ class EPuckDriver:
         self.messages_received = 0
         self.version = __version__
         self.debug = debug
+        self.pipelined = pipelined
+        self.rtt = RTTEstimator(initial = timeout)
+        self.stats = LinkStats()
 
         # Connection Attributes
-        self.socket = None
         self.address = address
+        self.transport = transport if transport is not None else BluetoothTransport(address)
+        if capture is not None:
+            self.transport = RecordingTransport(self.transport, capture)
         self.conexion_status = False
 
         # Camera attributes
@@ -136,10 +460,27 @@ class EPuckDriver:
         self._cam_zoom = None
         self._cam_mode = None
         self._cam_size = None
+        self.camera_fps = camera_fps
+        # Time when the last image was requested
+        self._frame_requested = float('-inf')
+        # Front and back buffers of the camera frames. The front buffer holds
+        # the last complete frame, the back buffer is being received
+        self._frame_buffers = None
+        # Image that is being received in the back buffer, see '_start_frame()'
+        self._frame_transit = None
+
+        # Reusable buffers for the binary replies, indexed by their size
+        self._reply_buffers = {}
 
         # Sensors and actuators lists
         self._sensors_to_read = []
-        self._actuators_to_write = []
+        # Binary and Ascii requests of the enabled sensors, see '_sensors_requests()'
+        self._requests = None
+        # Pending actuator commands indexed by their slot (motors, each led,
+        # camera, ...). Only the last command of every slot is sent
+        self._actuators_to_write = {}
+        # Last command sent to the robot for every slot
+        self._actuators_written = {}
 
         # Sensors
         self._accelerometer = (0, 0, 0)
@@ -152,10 +493,17 @@ class EPuckDriver:
         self._proximity = (0, 0, 0, 0, 0, 0, 0, 0)
         self._light_sensor = (0, 0, 0, 0, 0, 0, 0, 0)
         self._microphone = (0, 0, 0)
+        self._frame = None
         self._pil_image = None
+        # Time when the last values of every sensor were acquired, indexed by
+        # their slot, see 'get_timestamp()'
+        self._timestamps = {}
+        # Maximum age of the values of the sensors, indexed by their slot,
+        # see 'set_max_age()'
+        self._max_ages = {}
 
         # Leds
-        self._leds_status = [False] * 8
+        self._leds_status = [False] * 10
 
     #
     # Private methods
@@ -170,16 +518,20 @@ class EPuckDriver:
         """
 
         if self.debug:
-            print >> sys.stderr, '\033[31m[ePuck]:\033[0m ', ' '.join([str(e) for e in txt])
+            print('\033[31m[ePuck]:\033[0m ', ' '.join([str(e) for e in txt]), file = sys.stderr)
 
         return 0
 
-    def _recv(self, n = 4096):
+    def _recv(self, n = 4096, sent = None, timeout = None):
         """
         Receive data from the robot
 
         :param	n: 	Number of bytes you want to receive
         :type	n: 	int
+        :param	sent: 	Time when the request was sent. If indicated, a RTT sample is taken
+        :type	sent: 	float
+        :param	timeout: 	Timeout in seconds. By default, the adaptive timeout of the connection
+        :type	timeout: 	float
         :return: 	Data received from the robot as string if it was successful, raise an exception if not
         :rtype:		String
         :raise Exception:	If there is a communication problem
@@ -188,15 +540,93 @@ class EPuckDriver:
             raise Exception('There is not connection')
 
         try:
-            line = self.socket.recv(n)
+            self.transport.settimeout(self.rtt.timeout if timeout is None else timeout)
+            line = self.transport.recv(n)
+            if not line:
+                raise IOError('Connection closed by the robot')
             self.messages_received += 1
-        except bluetooth.btcommon.BluetoothError as e:
+            if sent is not None:
+                self.rtt.add(time.monotonic() - sent)
+        except IOError as e:
             txt = 'Bluetooth communication problem: ' + str(e)
             self._debug(txt)
             raise Exception(txt)
         else:
             return line
 
+    def _recv_into(self, buffer, sent = None):
+        """
+        Receive data from the robot until the given buffer is full. The data
+        is written in place, so no intermediate strings are created
+
+        :param	buffer: Writable buffer with the size of the expected reply
+        :type	buffer: memoryview
+        :param	sent: 	Time when the request was sent. If indicated, a RTT sample
+            is taken when the first bytes arrive
+        :type	sent: 	float
+        :return: 	The same buffer if it was successful, raise an exception if not
+        :rtype:		memoryview
+        :raise Exception:	If there is a communication problem
+        """
+        if not self.conexion_status:
+            raise Exception('There is not connection')
+
+        size = len(buffer)
+        received = 0
+        try:
+            self.transport.settimeout(self.rtt.timeout)
+            while received < size:
+                n = self.transport.recv_into(buffer[received:], size - received)
+                if n == 0:
+                    raise IOError('Connection closed by the robot')
+                if received == 0 and sent is not None:
+                    self.rtt.add(time.monotonic() - sent)
+                received += n
+                self.messages_received += 1
+        except IOError as e:
+            txt = 'Bluetooth communication problem: ' + str(e)
+            self._debug(txt)
+            raise Exception(txt)
+        else:
+            return buffer
+
+    def _flush_input(self):
+        """
+        Discard the data received until now. It's used before retrying a
+        request, so that the late replies of the previous try are not taken
+        as the reply of the new one
+        """
+        try:
+            self.transport.settimeout(self.rtt.timeout)
+            while self.transport.recv(4096):
+                pass
+        except IOError:
+            pass
+
+    def _timed_out(self):
+        """
+        Called when a reply is not received in time. The timeout is increased
+        and the input is flushed
+        """
+        self._debug('Communication timeout, retrying')
+        self.rtt.timed_out()
+        self._flush_input()
+
+    def _reply_buffer(self, size):
+        """
+        Return a preallocated buffer for a reply of the given size. The same
+        buffer is returned in every call with the same size, so its content
+        is only valid until the next reply of that size is received
+
+        :param	size: Size of the reply in bytes
+        :type	size: int
+        :rtype:	memoryview
+        """
+        buffer = self._reply_buffers.get(size)
+        if buffer is None:
+            buffer = self._reply_buffers[size] = memoryview(bytearray(size))
+        return buffer
+
     def _send(self, message):
         """
         Send data to the robot
@@ -210,7 +640,7 @@ class EPuckDriver:
             raise Exception('There is not connection')
 
         try:
-            n = self.socket.send(message)
+            n = self.transport.send(message)
             self.messages_sent += 1
         except Exception as e:
             self._debug('Send problem:', e)
@@ -220,38 +650,59 @@ class EPuckDriver:
 
     def _read_image(self):
         """
-        Returns an image obtained from the robot's camera. For communication
-        issues you only can get 1 image per second
-
-        :return: The image in PIL format
-        :rtype: PIL Image
+        Request an image from the robot's camera with its own message. It's
+        used when the driver is not pipelined, otherwise the images are
+        requested along with the sensors. The image is received in the
+        following steps, see '_drain_frame()'
         """
 
-        # Thanks to http://www.dailyenigma.org/e-puck-cam.shtml for
-        # the code for get the image from the camera
-        msg = struct.pack(">bb", - ord("I"), 0)
-
-        try:
-            n = self._send(msg)
-            self._debug("Reading Image: sending " + repr(msg) + " and " + str(n) + " bytes")
+        msg, size = self._image_request()
+        requested = time.monotonic()
+        n = self._send(msg)
+        self._debug("Reading Image: sending " + repr(msg) + " and " + str(n) + " bytes")
+        self._start_frame(requested)
+        self._drain_frame()
 
-            # We have to add 3 to the size, because with the image we
-            # get "mode", "width" and "height"
-            size = self._cam_size + 3
-            img = self._recv(size)
-            while len(img) != size:
-                img += self._recv(size)
+    def _drain_frame(self, block = False):
+        """
+        Receive the bytes of the image in transit that have already arrived.
+        When the image is complete, the frame buffers are swapped. The robot
+        sends the replies in order, so the replies of new requests arrive
+        after the image
 
-            # Create the PIL Image
-            image = Image.frombuffer("RGB", (self._cam_width, self._cam_height),
-                                     img, "raw",
-                                     "BGR;16", 0, 1)
+        :param block: If True, wait until the image is complete
+        :type block: Boolean
+        :return: True if there is not an image in transit anymore
+        :rtype: Boolean
+        """
+        transit = self._frame_transit
+        if transit is None:
+            return True
 
-            image = image.rotate(180)
-            self._pil_image = image
+        buffer = transit[0]
+        try:
+            self.transport.settimeout(self.rtt.timeout if block else 0)
+            while self._frame_transit is not None:
+                n = self.transport.recv_into(buffer[transit[2]:], len(buffer) - transit[2])
+                if n == 0:
+                    raise IOError('Connection closed by the robot')
+                self.messages_received += 1
+                self._frame_progress(n)
+
+        except (BlockingIOError, TimeoutError, socket.timeout) as e:
+            if block or self._frame_stalled():
+                self._debug('Problem receiving an image: ', e)
+                self._frame_lost()
+                self._flush_input()
+                return True
+            return False
 
-        except Exception as e:
+        except IOError as e:
             self._debug('Problem receiving an image: ', e)
+            self._frame_lost()
+            self._flush_input()
+
+        return True
 
     def _refresh_camera_parameters(self):
         """
@@ -259,17 +710,11 @@ class EPuckDriver:
         private methods
         """
         try:
-            msg = self.send_and_receive("I").split(',')
+            reply = self.send_and_receive("I")
         except:
             return False
         else:
-            self._cam_mode, \
-            self._cam_width, \
-            self._cam_height, \
-            self._cam_zoom, \
-            self._cam_size = [int(i) for i in msg[1:6]]
-
-            self._camera_parameters = self._cam_mode, self._cam_width, self._cam_height, self._cam_zoom
+            self._decode_camera_parameters(reply)
 
     def _write_actuators(self):
         """
@@ -277,137 +722,562 @@ class EPuckDriver:
         instead use 'step()'
         """
 
-        # Not all messages reply with AKC, only Ascii messages
-        acks = ['j', 't']
+        binary, binary_commands, ascii = self._actuators_messages()
+
+        # The binary commands don't have reply, they can be sent while an
+        # image is being received
+        if binary is not None:
+            n = self._send(binary)
+            self._debug('Binary message sent of [' + str(n) + '] bytes: ' + repr(binary))
+            self._actuators_sent(binary_commands, n == len(binary))
+
+        for slot, command, msg in ascii:
+            reply = self.send_and_receive(msg)
+            self._actuators_sent({slot: command}, reply is not None)
+            if self._actuator_acknowledged(reply):
+                self._refresh_camera_parameters()
+
+    def _queue_actuator(self, slot, command):
+        """
+        Queue a command for an actuator. It will be sent in the next 'step()',
+        replacing any previous command of the same slot
+
+        :param slot: Actuator slot, e.g ('D',) for the motors or ('L', 3) for the 4th led
+        :type slot: Tuple
+        :param command: Command to be sent
+        :type command: Tuple
+        """
+        self._actuators_to_write[slot] = command
+
+    def _set_led_status(self, led, value):
+        """
+        Update the status of a led and queue the command to change it. The
+        inverse value is translated into on/off, so consecutive commands for
+        the same led can be merged
+
+        :param led: Led number
+        :type led: int
+        :param value: 0 (Off), 1 (On) or 2 (Inverse)
+        :type value: int
+        """
+        if value == 0:
+            self._leds_status[led] = False
+        elif value == 1:
+            self._leds_status[led] = True
+        else:
+            self._leds_status[led] = not self._leds_status[led]
+
+        self._queue_actuator(("L", led), ("L", led, int(self._leds_status[led])))
+
+    def _read_sensors(self, image = False):
+        """
+        This method is used for read the ePuck's sensors. Don't use directly,
+        instead use 'step()'
+
+        :param image: If True, an image of the camera is also read
+        :type image: Boolean
+        """
+
+        binary_sensors, ascii_sensors = self._sensors_requests()
+        if self._max_ages:
+            binary_sensors, ascii_sensors = self._stale_sensors(binary_sensors, ascii_sensors)
+
+        for s in ascii_sensors:
+            requested = time.monotonic()
+            reply = self.send_and_receive(s)
+            self._decode_ascii_sensor(reply, (requested + time.monotonic()) / 2)
+
+        if self.pipelined:
+            # A single round trip for all the binary sensors and the image
+            if binary_sensors or image:
+                self._read_binary_sensors(binary_sensors, image)
+        else:
+            for sensor in binary_sensors:
+                self._read_binary_sensors([sensor])
+            if image:
+                self._read_image()
+
+    def _read_binary_sensors(self, binary_sensors, image = False):
+        """
+        Read the given sensors in binary mode with a single round trip
+
+        :param binary_sensors: List of codecs, see '_sensors_requests()'
+        :type binary_sensors: List
+        :param image: If True, an image is requested after the sensors
+        :type image: Boolean
+        """
+        message, size = self._binary_request(binary_sensors, image)
+        stats = self._binary_stats(binary_sensors)
+
+        # We make 4 tries before desist. Only the first one is used to
+        # estimate the RTT
+        tries = 1
+        start = time.monotonic()
+        while True:
+            self._debug('Sending binary message: ', repr(message))
+            requested = time.monotonic()
+            sent = requested if tries == 1 else None
+            self._send(message)
+            for command, n in stats:
+                command.requested(1) if tries == 1 else command.retried(1)
+
+            try:
+                # The values are acquired by the robot between the request
+                # and the reply, we take the midpoint
+                if size > 0:
+                    reply = self._recv_into(self._reply_buffer(size), sent)
+                    self._decode_binary_replies(binary_sensors, reply, (requested + time.monotonic()) / 2)
+                    sent = None
+
+                latency = time.monotonic() - start
+                for command, n in stats:
+                    command.replied(n, latency)
+
+                # The image arrives after the replies of the sensors. We don't
+                # wait for it, it's received in the following steps
+                if image:
+                    self._start_frame(requested)
+                    self._drain_frame()
+                return
+
+            except Exception as e:
+                for command, n in stats:
+                    command.timed_out()
+                if tries >= 4:
+                    for command, n in stats:
+                        command.failed()
+                    raise e
+                tries += 1
+                self._timed_out()
+
+    #
+    # Protocol encoding and decoding. These methods don't do any I/O, so
+    # they are shared by all the drivers (blocking and asyncio)
+    #
+
+    def _image_request(self):
+        """
+        Return the binary message used to request an image and the size of
+        the reply
+
+        :rtype: Tuple
+        """
+
+        # Thanks to http://www.dailyenigma.org/e-puck-cam.shtml for
+        # the code for get the image from the camera
+        msg = struct.pack(">bb", - ord("I"), 0)
+
+        # We have to add 3 to the size, because with the image we
+        # get "mode", "width" and "height"
+        return msg, self._cam_size + 3
+
+    def _binary_stats(self, binary_sensors):
+        """
+        Return the statistics of the commands of a binary request. The
+        statistics of the images are recorded when they are received, see
+        '_start_frame()'
+
+        :param binary_sensors: List of codecs
+        :type binary_sensors: List
+        :return: List of (statistics, size of the reply)
+        :rtype: List
+        """
+        return [(self.stats.binary_command(codec.opcode), codec.size) for codec in binary_sensors]
+
+    def _camera_due(self):
+        """
+        Check if a new image has to be requested to keep the target frame
+        rate of the camera. If so, the request time is updated
+
+        :rtype: Boolean
+        """
+        if not self._cam_enable or self._cam_size is None or not self.camera_fps:
+            return False
+
+        now = time.monotonic()
+        if now - self._frame_requested < 1 / self.camera_fps:
+            return False
+        self._frame_requested = now
+        return True
+
+    def _frame_buffer(self):
+        """
+        Return the back buffer of the camera frames, where the next image is
+        received
+
+        :rtype: memoryview
+        """
+        size = self._cam_size + 3
+        if self._frame_buffers is None or len(self._frame_buffers[1]) != size:
+            self._frame_buffers = [memoryview(bytearray(size)), memoryview(bytearray(size))]
+        return self._frame_buffers[1]
+
+    def _start_frame(self, requested):
+        """
+        Called when an image has been requested. Its bytes are received in
+        the back buffer in the following steps, see '_drain_frame()'
+
+        :param requested: Time when the image was requested
+        :type requested: float
+        """
+        self.stats.binary_command("I").requested(1)
+        # Back buffer, request time, bytes received, arrival of the first and
+        # of the last bytes
+        self._frame_transit = [self._frame_buffer(), requested, 0, None, requested]
+
+    def _frame_progress(self, n):
+        """
+        Called when bytes of the image in transit are received. If the image
+        is complete, the frame buffers are swapped
+
+        :param n: Number of bytes received
+        :type n: int
+        """
+        transit = self._frame_transit
+        now = time.monotonic()
+        transit[2] += n
+        if transit[3] is None:
+            transit[3] = now
+        transit[4] = now
+
+        buffer, requested, received, first = transit[:4]
+        if received < len(buffer):
+            return
+
+        self._frame_transit = None
+        self.stats.binary_command("I").replied(received, now - requested)
+        if self._frame_buffers is not None and buffer is self._frame_buffers[1]:
+            # The robot takes the picture when the request arrives and then
+            # starts sending it
+            self._swap_frame_buffers((requested + first) / 2)
+
+    def _frame_stalled(self):
+        """
+        :return: True if no bytes of the image in transit have been received
+            for longer than the timeout of the connection
+        :rtype: Boolean
+        """
+        return time.monotonic() - self._frame_transit[4] > self.rtt.timeout
+
+    def _frame_lost(self):
+        """
+        Called when the image in transit can't be received
+        """
+        stats = self.stats.binary_command("I")
+        stats.timed_out()
+        stats.failed()
+        self.rtt.timed_out()
+        self._frame_transit = None
+
+    def _swap_frame_buffers(self, timestamp = None):
+        """
+        Called when the back buffer holds a complete frame. It becomes the
+        front buffer and the image is built from it
+
+        :param timestamp: Time when the image was acquired
+        :type timestamp: float
+        """
+        self._frame_buffers.reverse()
+        self._decode_image(self._frame_buffers[0], timestamp)
+
+    def _decode_image(self, img, timestamp = None):
+        """
+        Decode the reply of an image request. The PIL image is not built
+        until it's requested with 'get_image()'
 
-        # We make a copy of the actuators list
-        actuators = self._actuators_to_write[:]
+        :param img: Reply received from the robot
+        :type img: Buffer
+        :param timestamp: Time when the image was acquired
+        :type timestamp: float
+        """
+        self._frame = decode_frame(img, self._cam_mode, self._cam_width, self._cam_height)
+        self._pil_image = None
+        if timestamp is not None:
+            self._timestamps["_frame"] = timestamp
+
+    def _decode_camera_parameters(self, reply):
+        """
+        Save the camera parameters sent by the robot in reply to 'I'
+
+        :param reply: Reply received from the robot
+        :type reply: String
+        """
+        msg = reply.split(',')
+        self._cam_mode, \
+        self._cam_width, \
+        self._cam_height, \
+        self._cam_zoom, \
+        self._cam_size = [int(i) for i in msg[1:6]]
+
+        self._camera_parameters = self._cam_mode, self._cam_width, self._cam_height, self._cam_zoom
+
+    def _actuators_messages(self):
+        """
+        Take the pending actuators commands and build the messages to be
+        sent to the robot
+
+        :return: The binary message (None if there are not binary commands),
+            the binary commands by slot and the list of Ascii commands as
+            (slot, command, message) tuples. The commands are not recorded
+            as written until they are sent, see '_actuators_sent()'
+        :rtype: Tuple
+        """
+
+        # State commands are not sent again if they didn't change since the
+        # last time, the others are always sent
+        actuators = self._actuators_to_write
+        self._actuators_to_write = {}
+
+        # All the binary messages are packed in one buffer and sent at once
+        binary = []
+        binary_commands = {}
+        ascii = []
+        for slot, m in actuators.items():
+            if m[0] in STATE_ACTUATORS and self._actuators_written.get(slot) == m:
+                continue
 
-        for m in actuators:
             if m[0] == 'L':
                 # Leds
-                msg = struct.pack('<bbb', - ord(m[0]), m[1], m[2])
-                n = self._send(msg)
-                self._debug('Binary message sent of [' + str(n) + '] bytes: ' + str(struct.unpack('<bbb', msg)))
+                binary.append(struct.pack('<bbb', - ord(m[0]), m[1], m[2]))
+                binary_commands[slot] = m
+                self.stats.binary_command(m[0]).requested(3)
 
             elif m[0] == 'D' or m[0] == 'P':
                 # Set motor speed or set motor position
-                msg = struct.pack('<bhh', - ord(m[0]), m[1], m[2])
-                n = self._send(msg)
-                self._debug('Binary message sent of [' + str(n) + '] bytes: ' + str(struct.unpack('<bhh', msg)))
+                binary.append(struct.pack('<bhh', - ord(m[0]), m[1], m[2]))
+                binary_commands[slot] = m
+                self.stats.binary_command(m[0]).requested(5)
 
             else:
                 # Others actuators, parameters are separated by commas
-                msg = ",".join(["%s" % i for i in m])
-                reply = self.send_and_receive(msg)
-                if reply == 'j':
-                    self._refresh_camera_parameters()
+                ascii.append((slot, m, ",".join(["%s" % i for i in m])))
 
-                if reply not in acks:
-                    self._debug('Unknown ACK reply from ePcuk: ' + reply)
+        if not binary:
+            return None, binary_commands, ascii
 
-            self._actuators_to_write.remove(m)
-        return
+        # The message ends with 0 to leave the binary mode
+        return b''.join(binary) + b'\x00', binary_commands, ascii
 
-    def _read_sensors(self):
+    def _actuators_sent(self, commands, sent):
         """
-        This method is used for read the ePuck's sensors. Don't use directly,
-        instead use 'step()'
+        Record the result of sending some actuators commands. If they were
+        sent, they are not sent again until they change. If not, the state
+        of those actuators in the robot is unknown: they are forgotten and
+        the state commands are queued again for the next 'step()' (unless a
+        newer command was queued meanwhile)
+
+        :param commands: Commands by slot
+        :type commands: Dictionary
+        :param sent: True if the commands were sent completely
+        :type sent: Boolean
         """
+        if sent:
+            self._actuators_written.update(commands)
+            return
 
-        # We can read sensors in two ways: Binary Mode and Ascii Mode
-        # Ascii mode is slower than Binary mode, therefore, we use
-        # Binary mode whenever we can. Not all sensors are available in
-        # Binary mode
+        for slot, m in commands.items():
+            self._actuators_written.pop(slot, None)
+            if m[0] in STATE_ACTUATORS:
+                self._actuators_to_write.setdefault(slot, m)
 
-        def send_binary_mode(parameters):
-            # Auxiliar function for sent messages in binary modes
-            # Parameters: ('Char to be sent', 'Size of reply waited', 'Format of the teply')
+    def _actuator_acknowledged(self, reply):
+        """
+        Check the reply of an Ascii actuator command
 
-            self._debug('Sending binary message: ', ','.join('%s' % i for i in parameters))
-            message = struct.pack(">bb", - ord(parameters[0]), 0)
-            self._send(message)
-            reply = self._recv()
-            while len(reply) < parameters[1]:
-                reply += self._recv()
-            reply = struct.unpack(parameters[2], reply)
+        :param reply: Reply received from the robot
+        :type reply: String
+        :return: True if the camera parameters have to be refreshed
+        :rtype: Boolean
+        """
+
+        # Not all messages reply with AKC, only Ascii messages
+        acks = ['j', 't']
+
+        if reply not in acks:
+            self._debug('Unknown ACK reply from ePcuk: ' + str(reply))
+
+        return reply == 'j'
+
+    def _sensors_requests(self):
+        """
+        Split the enabled sensors in the ones that are read in binary mode
+        and the ones that are read in Ascii mode. The result is cached until
+        the enabled sensors change
 
-            self._debug('Binary message recived: ', reply)
-            return reply
+        :return: List of codecs (see SENSOR_CODECS) of the binary sensors
+            and list of Ascii messages
+        :rtype: Tuple
+        """
+        if self._requests is not None:
+            return self._requests
 
-        # Read differents sensors
+        # We can read sensors in two ways: Binary Mode and Ascii Mode
+        # Ascii mode is slower than Binary mode, therefore, we use
+        # Binary mode whenever we can. Not all sensors are available in
+        # Binary mode
+        binary_sensors = []
+        ascii_sensors = []
         for s in self._sensors_to_read:
+            if s == 'a' and self._accelerometer_filtered:
+                # Accelerometer sensor in a filtered way
+                s = 'A'
 
-            if s == 'a':
-                # Accelerometer sensor in a non filtered way
-                if self._accelerometer_filtered:
-                    parameters = ('A', 12, '@III')
+            codec = SENSOR_CODECS.get(s)
 
-                else:
-                    parameters = ('a', 6, '@HHH')
-
-                reply = send_binary_mode(parameters)
-                if type(reply) is tuple and type(reply[0]) is int:
-                    self._accelerometer = reply
-
-            elif s == 'n':
-                # Proximity sensors
-                parameters = ('N', 16, '@HHHHHHHH')
-                reply = send_binary_mode(parameters)
-                if type(reply) is tuple and type(reply[0]) is int:
-                    self._proximity = reply
-
-            elif s == 'm':
-                # Floor sensors
-                parameters = ('M', 6, '@HHH')
-                reply = send_binary_mode(parameters)
-                if type(reply) is tuple and type(reply[0]) is int:
-                    self._floor_sensors = reply
-
-            elif s == 'q':
-                # Motor position sensor
-                parameters = ('Q', 4, '@HH')
-                reply = send_binary_mode(parameters)
-                if type(reply) is tuple and type(reply[0]) is int:
-                    self._motor_position = reply
-
-            elif s == 'o':
-                # Light sensors
-                parameters = ('O', 16, '@HHHHHHHH')
-                reply = send_binary_mode(parameters)
-                if type(reply) is tuple and type(reply[0]) is int:
-                    self._light_sensor = reply
-
-            elif s == 'u':
-                # Microphone
-                parameters = ('u', 6, '@HHH')
-                reply = send_binary_mode(parameters)
-                if type(reply) is tuple and type(reply[0]) is int:
-                    self._microphone = reply
-
-            elif s == 'e':
-                # Motor Speed
-                parameters = ('E', 4, '@HH')
-                reply = send_binary_mode(parameters)
-                if type(reply) is tuple and type(reply[0]) is int:
-                    self._motor_speed = reply
+            if codec is not None:
+                binary_sensors.append(codec)
 
             elif s == 'i':
                 # Do nothing for the camera, is an independent process
                 pass
 
             else:
-                reply = self.send_and_receive(s).split(",")
+                ascii_sensors.append(s)
 
-                t = reply[0]
-                response = tuple(reply[1:len(reply)])
+        self._requests = binary_sensors, ascii_sensors
+        return self._requests
 
-                if t == "c":
-                    # Selector
-                    self._selector = response[0]
+    def _stale_sensors(self, binary_sensors, ascii_sensors):
+        """
+        Filter the sensors whose last values are younger than their maximum
+        age, see 'set_max_age()'. They are not requested in this step
 
-                else:
-                    self._debug('Unknow type of sensor to read' + str(reply))
+        :param binary_sensors: List of codecs
+        :type binary_sensors: List
+        :param ascii_sensors: List of Ascii messages
+        :type ascii_sensors: List
+        :return: The binary and Ascii sensors that have to be requested
+        :rtype: Tuple
+        """
+        now = time.monotonic()
+
+        def stale(slot):
+            max_age = self._max_ages.get(slot)
+            return max_age is None or now - self._timestamps.get(slot, float('-inf')) > max_age
+
+        return [codec for codec in binary_sensors if stale(codec.slot)], [s for s in ascii_sensors if stale(SENSOR_SLOTS.get(s))]
+
+    def _sensor_slot(self, sensor):
+        """
+        Return the attribute of the driver where the values of a sensor are
+        saved
+
+        :param sensor: Name of the sensor, take a look to DIC_SENSORS
+        :type sensor: String
+        :rtype: String
+        """
+        key = DIC_SENSORS[sensor]
+        if key == 'a' and self._accelerometer_filtered:
+            key = 'A'
+        codec = SENSOR_CODECS.get(key)
+        return codec.slot if codec is not None else SENSOR_SLOTS[key]
+
+    def _binary_request(self, binary_sensors, image = False):
+        """
+        Build the binary message that requests the given sensors. The firmware
+        accepts a sequence of negative opcodes terminated by a 0 and sends the
+        replies concatenated in the same order
+
+        :param binary_sensors: List of codecs
+        :type binary_sensors: List
+        :param image: If True, an image is requested after the sensors
+        :type image: Boolean
+        :return: The message and the total size of the sensors replies (the
+            image, if requested, comes after them)
+        :rtype: Tuple
+        """
+        message = b''.join(codec.request for codec in binary_sensors)
+        if image:
+            message += struct.pack(">b", - ord("I"))
+        message += b'\x00'
+        size = sum(codec.size for codec in binary_sensors)
+        return message, size
+
+    def _decode_binary_replies(self, binary_sensors, reply, timestamp = None):
+        """
+        Parse the concatenated replies of a binary request by their known
+        sizes and save them
+
+        :param binary_sensors: List of codecs
+        :type binary_sensors: List
+        :param reply: Reply received from the robot
+        :type reply: Buffer
+        :param timestamp: Time when the values were acquired
+        :type timestamp: float
+        """
+        offset = 0
+        for codec in binary_sensors:
+            values = codec.struct.unpack_from(reply, offset)
+            offset += codec.size
+            setattr(self, codec.slot, values)
+            if timestamp is not None:
+                self._timestamps[codec.slot] = timestamp
+
+    def _decode_ascii_sensor(self, reply, timestamp = None):
+        """
+        Save the reply of a sensor read in Ascii mode
+
+        :param reply: Reply received from the robot
+        :type reply: String
+        :param timestamp: Time when the values were acquired
+        :type timestamp: float
+        """
+        reply = reply.split(",")
+
+        t = reply[0]
+        response = tuple(reply[1:len(reply)])
+
+        if t == "c":
+            # Selector
+            self._selector = response[0]
+            if timestamp is not None:
+                self._timestamps["_selector"] = timestamp
+
+        else:
+            self._debug('Unknow type of sensor to read' + str(reply))
+
+    def _ascii_request(self, msg):
+        """
+        Build an Ascii message
+
+        :param msg: The message you want to send
+        :type msg: String
+        :return: The message and the number of lines of the reply
+        :rtype: Tuple
+        """
+
+        # Make sure the Message is a string
+        message = str(msg)
+
+        # Add carriage return if not
+        if not message.endswith('\n'):
+            message += '\n'
+
+        # Check the lines of the waited reply
+        if message[0] in DIC_MSG:
+            lines = DIC_MSG[message[0]]
+        else:
+            lines = 1
+        self._debug('Waited lines:', lines)
+
+        return message, lines
+
+    def _filter_ascii_reply(self, message, reply):
+        """
+        Remove the noise of a (maybe partial) Ascii reply
+
+        :param message: The message sent
+        :type message: String
+        :param reply: The reply received until now
+        :type reply: String
+        :rtype: String
+        """
+        if message[0] == 'R':
+            # For some reason that I don't understand, if you send a reset
+            # command 'R', sometimes you recive 1 or 2 lines of 'z,Command not found\r\n'
+            # Therefor I have to remove it from the expected message: The Hello message
+            reply = reply.replace('z,Command not found\r\n' ,'')
+        return reply
 
 
     #
@@ -427,9 +1297,7 @@ class EPuckDriver:
             self._debug('Already connected')
             return False
         try:
-            self.socket = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
-            self.socket.connect((self.address, 1))
-            self.socket.settimeout(0.5)
+            self.transport.connect()
 
         except Exception as e:
             txt = 'Connection problem: \n' + str(e)
@@ -437,6 +1305,7 @@ class EPuckDriver:
             raise Exception(txt)
 
         self.conexion_status = True
+        self._frame_transit = None
         self._debug("Connected")
 
         self.reset()
@@ -463,8 +1332,8 @@ class EPuckDriver:
                 # Stop the robot
                 self.stop()
 
-                # Close the socket
-                self.socket.close()
+                # Close the connection
+                self.transport.close()
                 self.conexion_status = False
             except Exception as e:
                 raise Exception('Closing connection problem: \n' + str(e))
@@ -480,7 +1349,7 @@ class EPuckDriver:
 
         self.debug = debug
 
-    def send_and_receive(self, msg):
+    def send_and_receive(self, msg, timeout = None):
         """
         Send an Ascii message to the robot and return the reply. You can
         use it, but I don't recommend, use 'enable()', 'disable()'
@@ -488,6 +1357,9 @@ class EPuckDriver:
 
         :param msg: The message you want to send
         :type msg:	String
+        :param timeout: Fixed timeout for slow commands, in seconds. By
+            default, the adaptive timeout of the connection is used
+        :type timeout:	float
         :return: Response of the robot
         :rtype: String
         """
@@ -496,25 +1368,20 @@ class EPuckDriver:
         if not self.conexion_status:
             raise Exception('There is not connection')
 
-        # Make sure the Message is a string
-        message = str(msg)
+        # The reply would arrive after the image in transit
+        self._drain_frame(block = True)
 
-        # Add carriage return if not
-        if not message.endswith('\n'):
-            message += '\n'
-
-        # Check the lines of the waited reply
-        if message[0] in DIC_MSG:
-            lines = DIC_MSG[message[0]]
-        else:
-            lines = 1
-        self._debug('Waited lines:', lines)
+        message, lines = self._ascii_request(msg)
+        stats = self.stats.ascii_command(message[0])
 
         # We make 5 tries before desist
         tries = 1
+        start = time.monotonic()
         while tries < 5:
-            # Send the message
-            bytes = self._send(message)
+            # Send the message. Only the first try is used to estimate the RTT
+            sent = time.monotonic() if tries == 1 and timeout is None else None
+            bytes = self._send(message.encode('ascii'))
+            stats.requested(len(message)) if tries == 1 else stats.retried(len(message))
             self._debug('Message sent:', repr(message))
             self._debug('Bytes sent:', bytes)
 
@@ -522,18 +1389,19 @@ class EPuckDriver:
                 # Receive the reply. As we want to receive a line, we have to insist
                 reply = ''
                 while reply.count('\n') < lines:
-                    reply += self._recv()
-                    if message[0] == 'R':
-                        # For some reason that I don't understand, if you send a reset
-                        # command 'R', sometimes you recive 1 or 2 lines of 'z,Command not found\r\n'
-                        # Therefor I have to remove it from the expected message: The Hello message
-                        reply = reply.replace('z,Command not found\r\n' ,'')
+                    reply += self._recv(sent = sent, timeout = timeout).decode('latin-1')
+                    reply = self._filter_ascii_reply(message, reply)
+                    sent = None
                 self._debug('Message received: ', reply)
+                stats.replied(len(reply), time.monotonic() - start)
                 return reply.replace('\r\n' ,'')
 
             except Exception as e:
                 tries += 1
-                self._debug('Communication timeout, retrying')
+                stats.timed_out()
+                self._timed_out()
+
+        stats.failed()
 
 
 
@@ -548,8 +1416,9 @@ class EPuckDriver:
         :rtype:  Boolean
         """
 
-        if self._pil_image:
-            return self._pil_image.save(name)
+        image = self.get_image()
+        if image:
+            return image.save(name)
         else:
             return False
 
@@ -644,16 +1513,65 @@ class EPuckDriver:
         """
         return self.conexion_status
 
+    def set_camera_fps(self, fps):
+        """
+        Set the target frame rate of the camera. The real frame rate is
+        limited by the bandwidth and the rate of 'step()'
+
+        :param fps: Images per second. 0 or None to stop reading images
+        :type fps: float
+        """
+        self.camera_fps = fps
+
     def get_image(self):
         """
-        Return the last image captured from the ePuck's camera (after a 'step()').
-        None if	there are not images captured. The image is an PIL object
+        Return the last complete image captured from the ePuck's camera (after
+        a 'step()'). None if there are not images captured. The image is an
+        PIL object. This method never waits for an image
 
         :return: Image from robot's camera
         :rtype: PIL
         """
+        if self._pil_image is None and self._frame is not None:
+            self._pil_image = Image.fromarray(np.ascontiguousarray(self._frame))
         return self._pil_image
 
+    def get_frame(self):
+        """
+        Return the last complete image captured from the ePuck's camera as
+        a read only NumPy array, (height, width) for grey scale images and
+        (height, width, 3) for RGB images. None if there are not images
+        captured. Grey scale frames are views of the driver's buffers: they
+        are valid until the next image is received, copy them to keep them
+
+        :return: Image from robot's camera
+        :rtype: numpy.ndarray
+        """
+        return self._frame
+
+    def get_stats(self):
+        """
+        Return the statistics of the commands sent to the robot: number of
+        requests, bytes sent and received, retries, timeouts and latencies,
+        see 'LinkStats.snapshot()'
+
+        :return: Statistics of the binary and Ascii commands
+        :rtype: Dictionary
+        """
+        return self.stats.snapshot()
+
+    def get_rtt(self):
+        """
+        Return the estimated round trip time of the connection and the
+        timeout currently used for the replies. The step period can't be
+        lower than the RTT
+
+        :return: (smoothed RTT, RTT deviation, timeout) in seconds. The
+            RTT is None until the first reply is received
+        :rtype: Tuple
+        """
+        return self.rtt.srtt, self.rtt.rttvar, self.rtt.timeout
+
     def get_sercom_version(self):
         """
         :return: Return the ePuck's firmware version
@@ -670,6 +1588,7 @@ class EPuckDriver:
         :type filter: Boolean
         """
         self._accelerometer_filtered = filter
+        self._requests = None
 
     def disable(self, *sensors):
         """
@@ -683,7 +1602,7 @@ class EPuckDriver:
         """
         for sensor in sensors:
             try:
-                if not DIC_SENSORS.has_key(sensor):
+                if sensor not in DIC_SENSORS:
                     self._debug('Sensor "' + sensor + '" not in DIC_SENSORS')
                     break
 
@@ -694,6 +1613,7 @@ class EPuckDriver:
                     l = list(self._sensors_to_read)
                     l.remove(DIC_SENSORS[sensor])
                     self._sensors_to_read = tuple(l)
+                    self._requests = None
                     self._debug('Sensor "' + sensor + '" disabled')
                 else:
                     self._debug('Sensor "' + sensor + '" alrady disabled')
@@ -717,7 +1637,7 @@ class EPuckDriver:
         # Using the * as a parameters, we get a tuple with all sensors
         for sensor in sensors:
             try:
-                if not DIC_SENSORS.has_key(sensor):
+                if sensor not in DIC_SENSORS:
                     self._debug('Sensor "' + sensor + '" not in DIC_SENSORS')
                     break
 
@@ -728,7 +1648,6 @@ class EPuckDriver:
                         try:
                             self._refresh_camera_parameters()
                             self._cam_enable = True
-                            self.timestamp = time.time()
                         except:
                             break
 
@@ -736,6 +1655,7 @@ class EPuckDriver:
                     l = list(self._sensors_to_read)
                     l.append(DIC_SENSORS[sensor])
                     self._sensors_to_read = tuple(l)
+                    self._requests = None
                     self._debug('Sensor "' + sensor + '" enabled')
                 else:
                     self._debug('Sensor "' + sensor + '" alrady enabled')
@@ -744,6 +1664,67 @@ class EPuckDriver:
                 self._debug('Something wrong happened to enable the sensors: ', e)
         return self.get_sensors_enabled()
 
+    def get_sensor(self, sensor):
+        """
+        Return the last values read of a sensor that is read in binary mode,
+        including the ones added with 'register_sensor()'
+
+        :param sensor: Name of the sensor, take a look to DIC_SENSORS
+        :type sensor: String
+        :return: Values of the sensor or None if it has not been read yet
+        :rtype: Tuple
+        """
+        key = DIC_SENSORS[sensor]
+        if key == 'a' and self._accelerometer_filtered:
+            key = 'A'
+        return getattr(self, SENSOR_CODECS[key].slot, None)
+
+    def get_timestamp(self, sensor):
+        """
+        Return the time when the last values of a sensor were acquired by the
+        robot, in the clock of 'time.monotonic()'. It's estimated as the
+        midpoint between the request and the reply
+
+        :param sensor: Name of the sensor, take a look to DIC_SENSORS
+        :type sensor: String
+        :return: Timestamp or None if the sensor has not been read yet
+        :rtype: float
+        """
+        return self._timestamps.get(self._sensor_slot(sensor))
+
+    def get_age(self, sensor):
+        """
+        Return the age (in seconds) of the last values of a sensor, see
+        'get_timestamp()'
+
+        :param sensor: Name of the sensor, take a look to DIC_SENSORS
+        :type sensor: String
+        :return: Age or None if the sensor has not been read yet
+        :rtype: float
+        """
+        timestamp = self.get_timestamp(sensor)
+        return time.monotonic() - timestamp if timestamp is not None else None
+
+    def set_max_age(self, sensor, max_age):
+        """
+        Set the maximum age of the values of a sensor. The sensor is only
+        requested in 'step()' if its last values are older, so the sensors
+        that don't need to be read in every step don't use the link. For the
+        camera it's the same as 'set_camera_fps(1 / max_age)'
+
+        :param sensor: Name of the sensor, take a look to DIC_SENSORS
+        :type sensor: String
+        :param max_age: Maximum age in seconds. None to read the sensor in
+            every step
+        :type max_age: float
+        """
+        if sensor == "camera":
+            self.set_camera_fps(1 / max_age if max_age else float('inf'))
+        elif max_age is None:
+            self._max_ages.pop(self._sensor_slot(sensor), None)
+        else:
+            self._max_ages[self._sensor_slot(sensor)] = max_age
+
     def get_sensors_enabled(self):
         """
         :return: Return a list of sensors thar are active
@@ -769,7 +1750,7 @@ class EPuckDriver:
         # will be made by the ePuck's firmware. Here we need speed
         # and we lose time mading recurrent chekings
 
-        self._actuators_to_write.append(("D", int(l_motor), int(r_motor)))
+        self._queue_actuator(("D",), ("D", int(l_motor), int(r_motor)))
 
         return True
 
@@ -783,7 +1764,7 @@ class EPuckDriver:
         :type r_wheel: int
         """
 
-        self._actuators_to_write.append(("P", l_wheel, r_wheel))
+        self._queue_actuator(("P",), ("P", l_wheel, r_wheel))
 
     def set_led(self, led_number, led_value):
         """
@@ -802,13 +1783,7 @@ class EPuckDriver:
         value = abs(led_value)
 
         if led < 9:
-            self._actuators_to_write.append(("L", led, value))
-            if value == 0:
-                self._leds_status[led] = False
-            elif value == 1:
-                self._leds_status[led] = True
-            else:
-                self._leds_status[led] = not self._leds_status[led]
+            self._set_led_status(led, value)
             return True
         else:
             return False
@@ -826,14 +1801,7 @@ class EPuckDriver:
 
         value = abs(led_value)
 
-        self._actuators_to_write.append(("L", 8, value))
-
-        if value == 0:
-            self._leds_status[8] = False
-        elif value == 1:
-            self._leds_status[8] = True
-        else:
-            self._leds_status[8] = not self._leds_status[8]
+        self._set_led_status(8, value)
 
         return True
 
@@ -849,14 +1817,7 @@ class EPuckDriver:
         """
         value = abs(led_value)
 
-        self._actuators_to_write.append(("L", 9, value))
-
-        if value == 0:
-            self._leds_status[9] = False
-        elif value == 1:
-            self._leds_status[9] = True
-        else:
-            self._leds_status[9] = not self._leds_status[9]
+        self._set_led_status(9, value)
 
         return True
 
@@ -868,7 +1829,7 @@ class EPuckDriver:
         :type sound: int
         """
 
-        self._actuators_to_write.append(("T", sound))
+        self._queue_actuator(("T",), ("T", sound))
         return True
 
     def set_camera_parameters(self, mode, width, height, zoom):
@@ -888,23 +1849,27 @@ class EPuckDriver:
         if mode in CAM_MODE:
             self._cam_mode = CAM_MODE[mode]
         else:
-            self._debug(ERR_CAM_PARAMETERS, "Camera mode")
+            self._debug('Wrong camera parameter:', "Camera mode")
             return -1
 
         if int(zoom) in CAM_ZOOM:
             self._cam_zoom = zoom
         else:
-            self._debug(ERR_CAM_PARAMETERS, "Camera zoom")
+            self._debug('Wrong camera parameter:', "Camera zoom")
             return -1
 
-        if self.conexion_status and int(width) * int(height) <= 1600:
+        if int(width) * int(height) > 1600:
             # 1600 are for the resolution no greater than 40x40, I have
             # detect some problems
-            self._actuators_to_write.append(("J",
-                                             self._cam_mode,
-                                             width,
-                                             height,
-                                             self._cam_zoom))
+            self._debug('Wrong camera parameter:', "Camera size, width * height must be at most 1600")
+            return -1
+
+        if self.conexion_status:
+            self._queue_actuator(("J",), ("J",
+                                          self._cam_mode,
+                                          width,
+                                          height,
+                                          self._cam_zoom))
             return 0
 
     def calibrate_proximity_sensors(self):
@@ -915,7 +1880,7 @@ class EPuckDriver:
         :rtype: Boolean
         """
 
-        reply = self.send_and_receive("k" ,tries_timeout = 25)
+        reply = self.send_and_receive("k", timeout = 25)
         if reply[1] == "k":
             return True
         else:
@@ -935,6 +1900,9 @@ class EPuckDriver:
         msg = self.send_and_receive("R")
         self._debug(msg)
 
+        # The state of the actuators in the robot is not the last one sent
+        self._actuators_written.clear()
+
         return True
 
     def stop(self):
@@ -951,6 +1919,9 @@ class EPuckDriver:
         reply = self.send_and_receive("S")
         self._debug(reply)
 
+        # The state of the actuators in the robot is not the last one sent
+        self._actuators_written.clear()
+
         if reply == "s":
             return True
         else:
@@ -961,15 +1932,24 @@ class EPuckDriver:
         Method to update the sensor readings and to reflect changes in
         the actuators. Before invoking this method is not guaranteed
         the consistency of the sensors
+
+        :return: True if the sensors were read. While an image is being
+            received, the actuators are written but the sensors keep their
+            last values and False is returned
+        :rtype: Boolean
         """
 
         if not self.conexion_status:
             raise Exception('There is not connection')
 
         self._write_actuators()
-        self._read_sensors()
 
-        # Get an image in 1 FPS
-        if self._cam_enable and time.time() - self.timestamp > 1:
-            self._read_image()
-            self.timestamp = time.time()
+        # While an image is being received, the replies of new requests would
+        # arrive after it: the sensors keep their last values until the image
+        # is complete, so the step doesn't wait for it
+        if not self._drain_frame():
+            return False
+
+        # The images are requested along with the sensors at the camera frame rate
+        self._read_sensors(self._camera_due())
+        return True
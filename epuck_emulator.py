@@ -0,0 +1,277 @@
+from threading import Thread, Lock
+from select import select
+from socket import socketpair
+from time import sleep, monotonic
+import struct
+from epuck_transport import SocketTransport
+
+
+class EPuckEmulator(Thread):
+    '''
+    Emulador del firmware SerCom del robot e-puck. Se ejecuta en un hilo en el mismo proceso y se comunica
+    a través de uno de los extremos de un socketpair, de forma que la clase EPuckDriver puede usarse sin un
+    robot físico (ni la librería PyBluez) para hacer pruebas o medir el rendimiento del protocolo.
+    e.g:
+    emulator = EPuckEmulator(baudrate = 115200, latency = .02)
+    driver = EPuckDriver(transport = emulator.transport)
+    driver.connect()
+
+    Se implementan los comandos ASCII y los comandos binarios (opcodes negativos) que usa EPuckDriver.
+    '''
+
+    # Número de bytes de los argumentos de los comandos binarios y su formato
+    BINARY_ARGS = {
+        'D': '<hh',  # Velocidad de los motores
+        'P': '<hh',  # Posición de los motores
+        'L': '<bb'   # Leds
+    }
+
+    def __init__(self, baudrate = 115200, latency = 0):
+        '''
+        Inicializa el emulador y lo pone en marcha.
+        :param baudrate: Velocidad del enlace emulado en baudios. Se usa para retrasar el envío y la recepción
+        de los mensajes en función de su tamaño (10 bits por byte). Puede ser float('inf') para no limitar el
+        ancho de banda
+        :param latency: Latencia (en segundos) que se añade en cada sentido de la comunicación. Por defecto es 0
+        '''
+        super().__init__()
+        self.daemon = True
+
+        self.baudrate = baudrate
+        self.latency = latency
+
+        self._socket, client_socket = socketpair()
+        self.transport = SocketTransport(client_socket)
+
+        self._alive_lock = Lock()
+        self._alive = True
+
+        # Estado del robot emulado. Puede modificarse desde fuera para simular lecturas de los sensores
+        self.proximity = [0] * 8
+        self.floor_sensors = [0] * 3
+        self.light_sensor = [0] * 8
+        self.accelerometer = [0] * 3
+        self.microphone = [0] * 3
+        self.selector = 0
+        self.motor_speed = [0, 0]
+        self.motor_position = [0.0, 0.0]
+        self.leds = [False] * 10
+        self.sound = 0
+        self.camera_parameters = (1, 40, 40, 1)
+
+        self._motors_timestamp = monotonic()
+
+        self.start()
+
+    @property
+    def alive(self):
+        with self._alive_lock:
+            return self._alive
+
+    @alive.setter
+    def alive(self, state):
+        with self._alive_lock:
+            self._alive = state
+
+    def close(self):
+        self.alive = False
+        self.join()
+
+
+    def run(self):
+        try:
+            buffer = b''
+            while self.alive:
+                readable, writable, errored = select([self._socket], [], [], .05)
+                if not self._socket in readable:
+                    continue
+                data = self._socket.recv(4096)
+                if not data:
+                    break
+                self._delay(len(data))
+
+                buffer += data
+                reply, buffer = self._process(buffer)
+                if reply:
+                    self._transmit(reply)
+        except:
+            pass
+        finally:
+            self._socket.close()
+
+    def _delay(self, size):
+        '''
+        Simula el tiempo que tarda en transmitirse un mensaje del tamaño indicado por el enlace.
+        '''
+        delay = self.latency + size * 10 / self.baudrate
+        if delay > 0:
+            sleep(delay)
+
+    def _transmit(self, data, chunk_size = 64):
+        '''
+        Envía una respuesta. Tras la latencia del enlace, los datos se envían por partes al ritmo que marca
+        el ancho de banda (los primeros bytes llegan antes que los últimos, como en un enlace real)
+        '''
+        if self.latency > 0:
+            sleep(self.latency)
+        for offset in range(0, len(data), chunk_size):
+            chunk = data[offset:offset + chunk_size]
+            delay = len(chunk) * 10 / self.baudrate
+            if delay > 0:
+                sleep(delay)
+            self._socket.sendall(chunk)
+
+    def _process(self, buffer):
+        '''
+        Procesa todos los comandos completos del buffer.
+        :return: Devuelve una tupla con la concatenación de las respuestas y los bytes del buffer que no
+        se han procesado (comandos incompletos)
+        '''
+        replies = []
+        while len(buffer) > 0:
+            byte = buffer[0]
+            if byte == 0:
+                # Fin del modo binario
+                buffer = buffer[1:]
+
+            elif byte >= 0x80:
+                # Comando binario
+                opcode = chr(256 - byte)
+                args = self.BINARY_ARGS.get(opcode)
+                size = 1 + (struct.calcsize(args) if args is not None else 0)
+                if len(buffer) < size:
+                    break
+                params = struct.unpack_from(args, buffer, 1) if args is not None else ()
+                replies.append(self._binary_command(opcode, *params))
+                buffer = buffer[size:]
+
+            else:
+                # Comando ASCII
+                index = buffer.find(b'\n')
+                if index < 0:
+                    break
+                line = buffer[:index].decode('ascii', errors = 'replace').strip('\r')
+                buffer = buffer[index + 1:]
+                if line:
+                    replies.append(self._ascii_command(*line.split(',')).encode('ascii'))
+
+        return b''.join(replies), buffer
+
+
+    '''
+    Implementación de los comandos
+    '''
+
+    def _update_motors(self):
+        # Integramos la posición de los motores (en pasos) a partir de la velocidad (pasos / segundo)
+        now = monotonic()
+        dt = now - self._motors_timestamp
+        self._motors_timestamp = now
+        for index in range(0, 2):
+            self.motor_position[index] += self.motor_speed[index] * dt
+
+    def _set_motor_speed(self, left, right):
+        self._update_motors()
+        self.motor_speed = [int(left), int(right)]
+
+    def _set_motor_position(self, left, right):
+        self._update_motors()
+        self.motor_position = [float(left), float(right)]
+
+    def _get_motor_position(self):
+        self._update_motors()
+        return [int(position) & 0xFFFF for position in self.motor_position]
+
+    def _set_led(self, index, value):
+        indices = [index] if index < len(self.leds) else range(0, 8)
+        for index in indices:
+            self.leds[index] = (not self.leds[index]) if value == 2 else bool(value)
+
+    def _get_image(self):
+        mode, width, height, zoom = self.camera_parameters
+        bytes_per_pixel = 1 if mode == 0 else 2
+        pixels = bytes(((x + y) * 4) & 0xFF for y in range(0, height) for x in range(0, width * bytes_per_pixel))
+        return struct.pack('<BBB', mode, width, height) + pixels
+
+    def _get_image_size(self):
+        mode, width, height, zoom = self.camera_parameters
+        return width * height * (1 if mode == 0 else 2)
+
+    def _binary_command(self, opcode, *params):
+        if opcode == 'D':
+            self._set_motor_speed(*params)
+        elif opcode == 'P':
+            self._set_motor_position(*params)
+        elif opcode == 'L':
+            self._set_led(*params)
+        elif opcode == 'N':
+            return struct.pack('<8H', *self.proximity)
+        elif opcode == 'M':
+            return struct.pack('<3H', *self.floor_sensors)
+        elif opcode == 'O':
+            return struct.pack('<8H', *self.light_sensor)
+        elif opcode == 'Q':
+            return struct.pack('<2H', *self._get_motor_position())
+        elif opcode == 'E':
+            return struct.pack('<2H', *[speed & 0xFFFF for speed in self.motor_speed])
+        elif opcode == 'a':
+            return struct.pack('<3H', *self.accelerometer)
+        elif opcode == 'A':
+            return struct.pack('<3I', *self.accelerometer)
+        elif opcode == 'u':
+            return struct.pack('<3H', *self.microphone)
+        elif opcode == 'I':
+            return self._get_image()
+        return b''
+
+    def _ascii_command(self, command, *params):
+        def reply(*values):
+            return ','.join([command.lower()] + [str(value) for value in values]) + '\r\n'
+
+        command = command.upper()
+        if command == 'R':
+            self._set_motor_speed(0, 0)
+            self.leds = [False] * 10
+            return 'r\r\nWelcome to the emulated e-puck SerCom\r\n'
+        elif command == 'V':
+            return 'v,Version 1.2.2 August 2008\r\nHWRev 1.3 (emulated)\r\n'
+        elif command == 'S':
+            self._set_motor_speed(0, 0)
+            return reply()
+        elif command == 'K':
+            return 'k, Starting calibration\r\nk, Calibration in progress\r\nk, Calibration finished\r\n'
+        elif command == 'D':
+            self._set_motor_speed(*[int(param) for param in params])
+            return reply()
+        elif command == 'P':
+            self._set_motor_position(*[int(param) for param in params])
+            return reply()
+        elif command == 'L':
+            self._set_led(*[int(param) for param in params])
+            return reply()
+        elif command == 'T':
+            self.sound = int(params[0])
+            return reply()
+        elif command == 'J':
+            mode, width, height, zoom = [int(param) for param in params]
+            self.camera_parameters = (mode, width, height, zoom)
+            return reply()
+        elif command == 'I':
+            return reply(*(self.camera_parameters + (self._get_image_size(),)))
+        elif command == 'C':
+            return reply(self.selector)
+        elif command == 'N':
+            return reply(*self.proximity)
+        elif command == 'M':
+            return reply(*self.floor_sensors)
+        elif command == 'O':
+            return reply(*self.light_sensor)
+        elif command == 'Q':
+            return reply(*self._get_motor_position())
+        elif command == 'E':
+            return reply(*self.motor_speed)
+        elif command == 'A':
+            return reply(*self.accelerometer)
+        elif command == 'U':
+            return reply(*self.microphone)
+        return 'z,Command not found\r\n'
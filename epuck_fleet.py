@@ -0,0 +1,207 @@
+from time import monotonic
+from epuck_interface import EPuckInterface
+import epuck_discovery
+
+
+class LatencyStats:
+    '''
+    Estadísticas de la latencia (en segundos) de las actualizaciones de un robot.
+    '''
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.last = None
+        self.min = float('inf')
+        self.max = 0
+        self.total = 0
+
+    def add(self, latency):
+        self.count += 1
+        self.last = latency
+        self.min = min(self.min, latency)
+        self.max = max(self.max, latency)
+        self.total += latency
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count > 0 else None
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'last': self.last,
+            'mean': self.mean,
+            'min': self.min if self.count > 0 else None,
+            'max': self.max if self.count > 0 else None
+        }
+
+    def __str__(self):
+        return 'Latency. Last: {}, Mean: {}, Max: {}, Errors: {}'.format(self.last, self.mean, self.max, self.errors)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+
+def driver_state(driver):
+    '''
+    Devuelve los últimos valores de los sensores activos de una instancia de EPuckDriver.
+    :param driver: Instancia de EPuckDriver (o de EPuckSession)
+    :return: Diccionario con el nombre de cada sensor activo y sus valores. Para la cámara, la última imagen
+    completa
+    '''
+    state = {}
+    for sensor in driver.get_sensors_enabled():
+        if sensor == 'camera':
+            state[sensor] = driver.get_image()
+        elif sensor == 'selector':
+            state[sensor] = driver.get_selector()
+        else:
+            state[sensor] = driver.get_sensor(sensor)
+    return state
+
+
+
+class EPuckFleet:
+    '''
+    Permite actualizar varios robots (instancias de EPuckInterface o de EPuckDriver) en paralelo. Cada
+    robot se actualiza en un hilo de un pool, de forma que las escrituras de los actuadores y las lecturas de
+    los sensores de todos los robots se hacen de forma concurrente y el periodo del bucle no crece
+    linealmente con el número de robots.
+    e.g:
+    with EPuckFleet([EPuck(250), EPuck(251), EPuck(252)]) as fleet:
+        while True:
+            for epuck in fleet:
+                epuck.motors.speeds = 1
+            snapshots = fleet.step_all()
+    '''
+    def __init__(self, robots, max_workers = None):
+        '''
+        Inicializa la instancia.
+        :param robots: Lista de robots. Pueden ser instancias de EPuckInterface (se invoca su método
+        update()) o de EPuckDriver (se invoca su método step())
+        :param max_workers: Número de hilos del pool. Por defecto, un hilo por robot
+        '''
+        # concurrent.futures tarda en importarse (importa logging), solo se importa si se usa
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.robots = list(robots)
+        self.stats = [LatencyStats() for robot in self.robots]
+        self._executor = ThreadPoolExecutor(max_workers = max_workers or max(len(self.robots), 1))
+
+    def __iter__(self):
+        return iter(self.robots)
+
+    def __len__(self):
+        return len(self.robots)
+
+    def __getitem__(self, index):
+        return self.robots[index]
+
+    def _map(self, method):
+        '''
+        Invoca el método indicado en todos los robots de forma concurrente y espera a que todas las
+        invocaciones terminen.
+        :param method: Función que recibe un robot y sus estadísticas de latencia como parámetros
+        :return: Devuelve la lista de excepciones lanzadas (None para los robots en los que no hubo errores)
+        '''
+        def call(robot, stats):
+            try:
+                method(robot, stats)
+            except Exception as e:
+                return e
+
+        return list(self._executor.map(call, self.robots, self.stats))
+
+    def _raise_errors(self, errors, txt):
+        failed = ['{}: {}'.format(index, e) for index, e in enumerate(errors) if e is not None]
+        if failed:
+            raise Exception('{} ({})'.format(txt, ', '.join(failed)))
+
+
+    def live(self):
+        '''
+        Inicializa todos los robots de forma concurrente (método live() de EPuckInterface o connect() de
+        EPuckDriver). Las direcciones de los robots indicados por su ID se resuelven antes con una única
+        búsqueda de dispositivos bluetooth.
+        :return:
+        '''
+        ids = [robot.id for robot in self.robots if getattr(robot, 'id', None) is not None]
+        if ids:
+            try:
+                epuck_discovery.default_cache.get_addresses(ids)
+            except Exception:
+                # Cada robot informará del error al inicializarse
+                pass
+
+        def live(robot, stats):
+            if isinstance(robot, EPuckInterface):
+                robot.live()
+            elif not robot.is_connected():
+                robot.connect()
+
+        self._raise_errors(self._map(live), 'Failed to initialize e-puck robots')
+
+    def kill(self):
+        '''
+        Cierra todos los robots (método kill() de EPuckInterface o close() de EPuckDriver) y libera los
+        hilos del pool.
+        :return:
+        '''
+        def kill(robot, stats):
+            if isinstance(robot, EPuckInterface):
+                if robot.is_alive():
+                    robot.kill()
+            elif robot.is_connected():
+                robot.close()
+
+        try:
+            self._raise_errors(self._map(kill), 'Failed to close e-puck robots')
+        finally:
+            self._executor.shutdown()
+
+    def __enter__(self):
+        self.live()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.kill()
+
+
+    def step_all(self):
+        '''
+        Actualiza todos los robots de forma concurrente (se envían los nuevos parámetros de los actuadores y
+        se muestrean los sensores). Este método funciona como una barrera: no finaliza hasta que todos los
+        robots se han actualizado.
+        Se lanza una excepción si alguno de los robots no se ha podido actualizar (el resto sí se actualizan)
+        :return: Devuelve una lista con el estado de cada robot tras la actualización: el snapshot (ver
+        EPuckInterface.snapshot) para las instancias de EPuckInterface o un diccionario con los valores de los
+        sensores activos para las de EPuckDriver (ver driver_state)
+        '''
+        states = [None] * len(self.robots)
+
+        def step(robot, stats):
+            t0 = monotonic()
+            try:
+                if isinstance(robot, EPuckInterface):
+                    robot.update()
+                    state = robot.snapshot()
+                else:
+                    robot.step()
+                    state = driver_state(robot)
+            except:
+                stats.errors += 1
+                raise
+            stats.add(monotonic() - t0)
+            states[self.stats.index(stats)] = state
+
+        self._raise_errors(self._map(step), 'Failed to update e-puck robots')
+        return states
+
+    def get_stats(self):
+        '''
+        :return: Devuelve una lista con las estadísticas de latencia de cada robot (diccionarios con las
+        claves count, errors, last, mean, min y max)
+        '''
+        return [stats.as_dict() for stats in self.stats]
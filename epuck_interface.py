@@ -1,8 +1,21 @@
 from types import SimpleNamespace as Namespace
-from PIL import Image
-from pyvalid import accepts
-from pyvalid.validators import is_validator
+from collections import namedtuple
+from functools import partial
+from threading import RLock, current_thread
+from time import monotonic
+from epuck_lazy import lazy_import
+from epuck_validation import accepts, checked, in_range
+import epuck_validation
 import epuck_constraints
+from epuck_odometry import Odometry
+from epuck_trajectory import TrajectoryExecutor
+
+# PIL y NumPy se cargan la primera vez que se usan
+Image = lazy_import('PIL.Image')
+np = lazy_import('numpy')
+
+# Algoritmo de redimensionamiento por defecto del sensor de visión (PIL.Image.NEAREST)
+NEAREST = 0
 
 
 def alive(unchecked_method):
@@ -15,7 +28,7 @@ def alive(unchecked_method):
             raise Exception('E-Puck is not connected')
         return unchecked_method(self, *args, **kwargs)
 
-    return checked_method
+    return checked(checked_method, unchecked_method)
 
 def not_alive(unchecked_method):
     def checked_method(self, *args, **kwargs):
@@ -23,337 +36,597 @@ def not_alive(unchecked_method):
             raise Exception('E-Puck is already connected')
         return unchecked_method(self, *args, **kwargs)
 
-    return checked_method
+    return checked(checked_method, unchecked_method)
 
 
 
-# Clase auxiliar. Nos permitirá crear propiedades y/o métodos setter/getter en listas que obtendrán info/modificarán
-# todos los items. Por ejemplo, para activar/desactivar todos los sensores de proximidad al mismo tiempo de una
-# forma sencilla como epuck.proximity_sensors.enable = True
-class CustomListFactory:
-    def create(self, *args, **kwargs):
-        class CustomList(list):
-            def __init__(self, *args, **kwargs):
-                super().__init__(*args, **kwargs)
-
-            def add_global_getter_method(self, method_name, new_name = None):
-                def getter(self):
-                    result = []
-                    for item in self:
-                        method = getattr(item.__class__, method_name)
-                        ret = method(item)
-                        result.append(ret)
-                    return result
-                getter.__name__ = method_name if new_name is None else new_name
-                setattr(self.__class__, getter.__name__, getter)
+# Grupos de componentes del robot (sensores de proximidad, sensores de suelo, leds, motores). Son listas de
+# componentes con propiedades que obtienen información de todos ellos o la modifican a la vez. Los valores se
+# devuelven como arrays de NumPy y se obtienen/modifican con una sola invocación a la implementación del
+# robot. Por ejemplo, para activar todos los sensores de proximidad: epuck.prox_sensors.enabled = True
+class ComponentGroup(list):
+    def __init__(self, items, positions = None):
+        '''
+        Inicializa el grupo.
+        :param items: Componentes del grupo
+        :param positions: Posiciones de los componentes en los valores obtenidos o modificados por la
+        implementación del robot. Por defecto, la posición de cada componente en el grupo
+        '''
+        super().__init__(items)
+        self.positions = np.arange(len(self)) if positions is None else np.asarray(positions)
 
-            def add_global_setter_method(self, method_name, new_name = None):
-                def setter(self, value):
-                    for item in self:
-                        method = getattr(item.__class__, method_name)
-                        method(item, value)
-                setter.__name__ = method_name if new_name is None else new_name
-                setattr(self.__class__, setter.__name__, setter)
+    def __getitem__(self, index):
+        items = super().__getitem__(index)
+        if not isinstance(index, slice):
+            return items
 
+        # Un subgrupo comparte la configuración del grupo, salvo las posiciones de sus componentes
+        group = self.__class__.__new__(self.__class__)
+        list.__init__(group, items)
+        group.__dict__.update(self.__dict__)
+        group.positions = self.positions[index]
+        return group
 
-            def add_global_property(self, property_name, new_name = None):
-                def getter(self):
-                    result = []
-                    for item in self:
-                        prop = getattr(item.__class__, property_name)
-                        ret = prop.fget(item)
-                        result.append(ret)
-                    return result
+    def _broadcast(self, values, dtype):
+        # Un valor escalar se aplica a todos los componentes
+        return np.broadcast_to(np.asarray(values, dtype = dtype), (len(self),)).tolist()
 
-                def setter(self, value):
-                    for item in self:
-                        prop = getattr(item.__class__, property_name)
-                        prop.fset(item, value)
 
-                getter.__name__ = setter.__name__ = property_name if new_name is None else new_name
+class SensorGroup(ComponentGroup):
+    def __init__(self, items, fetch = None, dtype = 'uint16', positions = None, subscribe = None):
+        '''
+        Inicializa el grupo.
+        :param items: Sensores del grupo
+        :param fetch: Función que muestrea todos los sensores a la vez y devuelve sus valores
+        :param dtype: Tipo de los valores de los sensores
+        :param subscribe: Función que registra una subscripción (ver on_change)
+        '''
+        super().__init__(items, positions)
+        self._fetch = fetch
+        self._dtype = dtype
+        self._subscribe = subscribe
 
-                prop = property(getter)
-                prop = prop.setter(setter)
-                setattr(self.__class__, getter.__name__, prop)
+    def on_change(self, callback, threshold = None, delta = None, debounce = 0):
+        '''
+        Registra una función que se invocará cuando cambien los valores de los sensores del grupo. Los valores
+        se comprueban una vez en cada invocación de update(), de forma vectorizada, y la función solo se invoca
+        si alguno de los sensores ha cruzado el umbral o ha cambiado más de lo indicado desde la última vez
+        que se invocó. Si no se indica ni el umbral ni la diferencia, se invoca con cualquier cambio.
+        e.g:
+        epuck.prox_sensors.on_change(lambda values, changed: print(values), threshold = 500, debounce = .2)
+
+        :param callback: Función que recibe los valores de los sensores (array de NumPy) y un array de valores
+        booleanos que indica qué sensores han cambiado
+        :param threshold: Umbral. Se notifica cuando un sensor pasa de estar por debajo a estar por encima (o
+        igual) del umbral o viceversa
+        :param delta: Se notifica cuando un sensor cambia más de esta cantidad
+        :param debounce: Tiempo mínimo (en segundos) entre dos notificaciones
+        :return: Devuelve la subscripción. Puede cancelarse con su método cancel()
+        '''
+        if self._fetch is None or self._subscribe is None:
+            raise NotImplementedError()
+        subscription = Subscription(self, callback, threshold, delta, debounce)
+        self._subscribe(subscription)
+        return subscription
+
+    @property
+    def enabled(self):
+        return np.fromiter((sensor.enabled for sensor in self), bool, len(self))
+
+    @enabled.setter
+    def enabled(self, states):
+        for sensor, state in zip(self, self._broadcast(states, bool)):
+            sensor.enabled = state
+
+    @property
+    def values(self):
+        '''
+        :return: Devuelve los valores de los sensores del grupo como un array de NumPy. Se muestrean todos
+        a la vez
+        '''
+        if self._fetch is None:
+            raise NotImplementedError()
+        for sensor in self:
+            if not sensor.enabled:
+                raise Exception('{} is not enabled. Enable it in order to get sensor data'.format(sensor.__class__.__name__))
+        values = self._fetch()
+        if any(value is None for value in values):
+            # Alguna implementación no proporciona valores para estos sensores
+            return np.asarray(values, dtype = object)[self.positions]
+        return np.asarray(values, dtype = self._dtype)[self.positions]
+
+
+class Subscription:
+    '''
+    Subscripción a los cambios de los valores de un grupo de sensores (ver SensorGroup.on_change)
+    '''
+    __slots__ = ('group', 'callback', 'threshold', 'delta', 'debounce', 'active', '_values', '_timestamp')
 
-            def __getitem__(self, index):
-                items = super().__getitem__(index)
-                return CustomList(items) if isinstance(items, list) else items
+    def __init__(self, group, callback, threshold = None, delta = None, debounce = 0):
+        self.group = group
+        self.callback = callback
+        self.threshold = threshold
+        self.delta = delta
+        self.debounce = debounce
+        self.active = True
 
-        return CustomList(*args, **kwargs)
+        # Valores de los sensores en la última notificación
+        self._values = None
+        self._timestamp = float('-inf')
 
+    def cancel(self):
+        '''
+        Cancela la subscripción.
+        :return:
+        '''
+        self.active = False
 
+    def evaluate(self, timestamp):
+        '''
+        Comprueba si los valores de los sensores han cambiado desde la última notificación y, si es así,
+        invoca la función de la subscripción.
+        :param timestamp: Instante actual (en segundos)
+        :return:
+        '''
+        if not all(sensor.enabled for sensor in self.group):
+            return
+        values = self.group.values
+        if values.dtype == object:
+            return
+        last = self._values
+        if last is None:
+            # La primera lectura se toma como referencia
+            self._values = values.astype(np.float64)
+            return
+
+        if timestamp - self._timestamp < self.debounce:
+            return
+
+        if self.threshold is not None:
+            changed = (values >= self.threshold) != (last >= self.threshold)
+            if self.delta is not None:
+                changed |= np.abs(values - last) > self.delta
+        else:
+            changed = np.abs(values - last) > (self.delta or 0)
 
-class EPuckInterface:
-    '''
-    Representa el robot e-puck.
-    Es una clase que define una interfaz para interactuar con un robot, ya sea virtual o físico.
-    Provee métodos y atributos para muestrar los sensores (de proximidad y de visión),
-    establecer la velodidad de los motores, ...
+        if changed.any():
+            self._values = values.astype(np.float64)
+            self._timestamp = timestamp
+            self.callback(values, changed)
 
-    Las implementaciones de esta interfaz son: Epuck y VrepEPuck
-    '''
 
 
-    class Validators:
+class MotorGroup(ComponentGroup):
+    def __init__(self, items, push, positions = None, lock = None):
         '''
-        Clase auxiliar para validar parámetros de algunos métodos de la clase EPuckInterface.
+        Inicializa el grupo.
+        :param items: Motores del grupo
+        :param push: Función que establece la velocidad de varios motores a la vez. Recibe la lista de
+        posiciones de los motores y la lista de velocidades
+        :param lock: Cerrojo que se adquiere al leer o modificar las velocidades, para que puedan modificarse
+        desde varios hilos a la vez (por ejemplo, desde un TrajectoryExecutor)
+        '''
+        super().__init__(items, positions)
+        self._push = push
+        self._lock = lock if lock is not None else RLock()
+
+    @property
+    def speeds(self):
+        with self._lock:
+            return np.fromiter((motor.speed for motor in self), np.float64, len(self))
+
+    @speeds.setter
+    def speeds(self, speeds):
+        speeds = self._broadcast(speeds, np.float64)
+        with self._lock:
+            self._push(self.positions.tolist(), speeds)
+            for motor, speed in zip(self, speeds):
+                motor._speed = speed
+
+
+class LedGroup(ComponentGroup):
+    def __init__(self, items, push, positions = None):
         '''
+        Inicializa el grupo.
+        :param items: Leds del grupo
+        :param push: Función que establece el estado de varios leds a la vez. Recibe la lista de
+        posiciones de los leds y la lista de estados
+        '''
+        super().__init__(items, positions)
+        self._push = push
 
-        @staticmethod
-        @is_validator
-        def validate_image_size(size):
-            '''
-            Valida el valor que establece las dimensiones de la imágen devuelta por el método
-            _get_vision_sensor_image
-            :param size:
-            :return:
-            '''
-            return isinstance(size, tuple) and len(size) == 2
+    @property
+    def states(self):
+        return np.fromiter((led.state for led in self), bool, len(self))
 
-        @staticmethod
-        def validate_value_in_range(a, b):
-            '''
-            Devuelve un método validador que sirve para comprobar si un valor está en intervalo indicado.
-            :param a: Extremo izquierdo del intervalo (inclusive)
-            :param b: Extremo derecho del intervalo (inclusive)
-            :return:
-            '''
-            @is_validator
-            def validator(value):
-                return value >= a and value <= b
+    @states.setter
+    def states(self, states):
+        states = self._broadcast(states, bool)
+        self._push(self.positions.tolist(), states)
+        for led, state in zip(self, states):
+            led._state = state
 
-            return validator
 
 
+# Componentes del robot (motores, leds y sensores). Cada componente guarda una referencia al robot al que
+# pertenece (atributo epuck) y delega en sus métodos
+class LeftMotor:
+    __slots__ = ('epuck', '_speed')
 
-    def __init__(self, asynch_update, *args, **kwargs):
+    def __init__(self, epuck):
+        self.epuck = epuck
+        self._speed = 0
+
+    @property
+    def speed(self):
+        return self._speed
+
+    @speed.setter
+    def speed(self, amount):
+        with self.epuck._motors_lock:
+            self.epuck._set_left_motor_speed(amount)
+            self._speed = amount
+
+    def __str__(self):
+        return 'Left motor. Speed: {} rads / sec'.format(self.speed)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class RightMotor:
+    __slots__ = ('epuck', '_speed')
+
+    def __init__(self, epuck):
+        self.epuck = epuck
+        self._speed = 0
+
+    @property
+    def speed(self):
+        return self._speed
+
+    @speed.setter
+    def speed(self, amount):
+        with self.epuck._motors_lock:
+            self.epuck._set_right_motor_speed(amount)
+            self._speed = amount
+
+    def __str__(self):
+        return 'Right motor. Speed: {} rads / sec'.format(self.speed)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class Led:
+    __slots__ = ('epuck', 'index', '_state')
+
+    def __init__(self, epuck, index):
+        self.epuck = epuck
+        self.index = index
+        self._state = False
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        self.epuck._set_led_state(self.index, state)
+        self._state = state
+
+    def __str__(self):
+        return '{}th led. State: {}'.format(self.index + 1, 'enabled' if self.state else 'disabled')
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class Sensor:
+    __slots__ = ('epuck', '_enabled')
+
+    # Nombre del tipo de sensor (ver EPuckInterface.set_max_age)
+    kind = None
+
+    def __init__(self, epuck):
+        self.epuck = epuck
+        self._enabled = False
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, new_state):
+        old_state = self._enabled
+        self._enabled = new_state
+        if new_state ^ old_state:
+            self._enable_state_changed()
+
+    def _enable_state_changed(self):
+        raise NotImplementedError()
+
+    def _get_value(self):
+        raise NotImplementedError()
+
+    @property
+    def value(self):
+        if not self.enabled:
+            raise Exception('{} is not enabled. Enable it in order to get sensor data'.format(self.__class__.__name__))
+        return self._get_value()
+
+    @property
+    def timestamp(self):
         '''
-        Inicializa esta instancia.
-        :param asynch_update: Indica si esta clase se engargará de mantener actualizados los valores
-        de los sensores y de modificar los parámetros de los actuadores de forma asíncrona o no.
-        Si este parámetro es False, deberá invocarse el método update() para obtener información actualizada
-        de los sensores del dispositivo y para hacer efectivos los cambios en los parámetros de los
-        actuadores.
-        :param args:
-        :param kwargs:
+        :return: Devuelve el instante (reloj monotónico) en el que se adquirió la última lectura de este
+        tipo de sensor o None si no se ha leído nunca
         '''
-        epuck = self
+        return self.epuck.get_reading_timestamp(self.kind)
 
-        class LeftMotor:
-            def __init__(self):
-                self._speed = 0
+    @property
+    def age(self):
+        '''
+        :return: Devuelve la antigüedad (en segundos) de la última lectura de este tipo de sensor o None si no
+        se ha leído nunca
+        '''
+        timestamp = self.timestamp
+        return monotonic() - timestamp if timestamp is not None else None
 
-            @property
-            def speed(self):
-                return self._speed
+    @property
+    def max_age(self):
+        '''
+        Antigüedad máxima (en segundos) de las lecturas de este tipo de sensor. Al modificarla se modifica la
+        de todos los sensores del mismo tipo. Ver EPuckInterface.set_max_age
+        '''
+        return self.epuck.get_max_age(self.kind)
 
-            @speed.setter
-            def speed(self, amount):
-                epuck._set_left_motor_speed(amount)
-                self._speed = amount
+    @max_age.setter
+    def max_age(self, max_age):
+        self.epuck.set_max_age(self.kind, max_age)
 
-            def __str__(self):
-                return 'Left motor. Speed: {} rads / sec'.format(self.speed)
+    def __repr__(self):
+        return self.__str__()
 
-            def __repr__(self):
-                return self.__str__()
 
-        class RightMotor:
-            def __init__(self):
-                self._speed = 0
+class ProximitySensor(Sensor):
+    __slots__ = ('index',)
+    kind = 'prox_sensors'
 
-            @property
-            def speed(self):
-                return self._speed
+    def __init__(self, epuck, index):
+        super().__init__(epuck)
+        self.index = index
 
-            @speed.setter
-            def speed(self, amount):
-                epuck._set_right_motor_speed(amount)
-                self._speed = amount
+    def _enable_state_changed(self):
+        self.epuck._enable_prox_sensor(self.index, self.enabled)
 
-            def __str__(self):
-                return 'Right motor. Speed: {} rads / sec'.format(self.speed)
+    def _get_value(self):
+        return self.epuck._read(self.epuck._get_prox_sensor, self.index)
 
-            def __repr__(self):
-                return self.__str__()
+    def on_change(self, *args, **kwargs):
+        '''
+        Registra una función que se invocará cuando cambie el valor de este sensor. Ver SensorGroup.on_change
+        '''
+        return self.epuck.prox_sensors[self.index:self.index + 1].on_change(*args, **kwargs)
 
-        class Led:
-            def __init__(self, index):
-                self.index = index
-                self._state = False
+    def __str__(self):
+        return '{}th proximity sensor. Value: {}'.format(self.index + 1, self.value)
 
-            @property
-            def state(self):
-                return self._state
 
-            @state.setter
-            def state(self, state):
-                epuck._set_led_state(self.index, state)
-                self._state = state
+class FloorSensor(Sensor):
+    __slots__ = ('index',)
+    kind = 'floor_sensors'
 
-            def __str__(self):
-                return '{}th led. State: {}'.format(self.index + 1, 'enabled' if self.state else 'disabled')
+    def __init__(self, epuck, index):
+        super().__init__(epuck)
+        self.index = index
 
-            def __repr__(self):
-                return self.__str__()
+    def _enable_state_changed(self):
+        self.epuck._enable_floor_sensor(self.index, self.enabled)
 
+    def _get_value(self):
+        return self.epuck._read(self.epuck._get_floor_sensor, self.index)
 
-        class Sensor:
-            def __init__(self):
-                self._enabled = False
+    def on_change(self, *args, **kwargs):
+        '''
+        Registra una función que se invocará cuando cambie el valor de este sensor. Ver SensorGroup.on_change
+        '''
+        index = self.epuck.floor_sensors.index(self)
+        return self.epuck.floor_sensors[index:index + 1].on_change(*args, **kwargs)
 
-            @property
-            def enabled(self):
-                return self._enabled
+    def __str__(self):
+        return '{} floor sensor. Value: {}'.format(self.index, self.value)
 
-            @enabled.setter
-            def enabled(self, new_state):
-                old_state = self._enabled
-                self._enabled = new_state
-                if new_state ^ old_state:
-                    self._enable_state_changed()
 
-            def _enable_state_changed(self):
-                raise NotImplementedError()
+class LightSensor(Sensor):
+    __slots__ = ()
+    kind = 'light_sensor'
 
-            def _get_value(self):
-                raise NotImplementedError()
+    def __init__(self, epuck):
+        super().__init__(epuck)
 
-            @property
-            def value(self):
-                if not self.enabled:
-                    raise Exception('{} is not enabled. Enable it in order to get sensor data'.format(self.__class__.__name__))
-                return self._get_value()
+    def _enable_state_changed(self):
+        self.epuck._enable_light_sensor(self.enabled)
 
-            def __repr__(self):
-                return self.__str__()
+    def _get_value(self):
+        return self.epuck._read(self.epuck._get_light_sensor)
 
+    def __str__(self):
+        return 'Light sensor. Value: {}'.format(self.value)
 
 
-        class ProximitySensor(Sensor):
-            def __init__(self, index):
-                super().__init__()
-                self.index = index
+class VisionSensor(Sensor):
+    __slots__ = ()
+    kind = 'vision_sensor'
 
-            def _enable_state_changed(self):
-                epuck._enable_prox_sensor(self.index, self.enabled)
+    def __init__(self, epuck):
+        super().__init__(epuck)
 
-            def _get_value(self):
-                return epuck._get_prox_sensor(self.index)
+    def _enable_state_changed(self):
+        self.epuck._enable_vision_sensor(self.enabled)
 
-            def __str__(self):
-                return '{}th proximity sensor. Value: {}'.format(self.index + 1, self.value)
+    def _get_value(self):
+        return self.epuck._read(self.epuck._get_vision_sensor)
 
+    @property
+    def image(self):
+        return self.value
 
+    @property
+    def mode(self):
+        return self.epuck._vision_sensor_params[0]
 
-        class FloorSensor(Sensor):
-            def __init__(self, index):
-                super().__init__()
-                self.index = index
+    @property
+    def size(self):
+        return self.epuck._vision_sensor_params[1]
 
-            def _enable_state_changed(self):
-                epuck._enable_floor_sensor(self.index, self.enabled)
+    @property
+    def zoom(self):
+        return self.epuck._vision_sensor_params[2]
 
-            def _get_value(self):
-                return epuck._get_floor_sensor(self.index)
+    @property
+    def resample(self):
+        return self.epuck._vision_sensor_params[3]
 
-            def __str__(self):
-                return '{} floor sensor. Value: {}'.format(self.index, self.value)
 
+    def set_params(self, *args, **kwargs):
+        self.epuck._set_vision_sensor_params(*args, **kwargs)
 
-        class LightSensor(Sensor):
-            def __init__(self):
-                super().__init__()
+    @property
+    def params(self):
+        return (self.mode, self.size, self.zoom, self.resample)
 
-            def _enable_state_changed(self):
-                epuck._enable_light_sensor(self.enabled)
+    @params.setter
+    def params(self, params):
+        self.set_params(*params)
 
-            def _get_value(self):
-                return epuck._get_light_sensor()
 
-            def __str__(self):
-                return 'Light sensor. Value: {}'.format(self.value)
+    def __str__(self):
+        return 'Vision sensor. Mode: {}, Dimensions: {}, Zoom: {}'.format(self.mode, self.size, self.zoom)
 
 
 
-        class VisionSensor(Sensor):
-            def __init__(self):
-                super().__init__()
+# Estado completo del robot tras una actualización (ver EPuckInterface.snapshot)
+Snapshot = namedtuple('Snapshot', ('timestamp', 'prox_sensors', 'floor_sensors', 'light_sensor', 'vision_sensor',
+                                   'motors', 'leds', 'pose', 'velocity', 'acquired'))
 
-            def _enable_state_changed(self):
-                epuck._enable_vision_sensor(self.enabled)
+# Instantes de adquisición de las lecturas de cada tipo de sensor de un snapshot
+SensorTimestamps = namedtuple('SensorTimestamps', ('prox_sensors', 'floor_sensors', 'light_sensor', 'vision_sensor'))
 
-            def _get_value(self):
-                return epuck._get_vision_sensor()
 
-            @property
-            def image(self):
-                return self.value
 
-            @property
-            def mode(self):
-                return epuck._vision_sensor_params[0]
+class EPuckInterface:
+    '''
+    Representa el robot e-puck.
+    Es una clase que define una interfaz para interactuar con un robot, ya sea virtual o físico.
+    Provee métodos y atributos para muestrar los sensores (de proximidad y de visión),
+    establecer la velodidad de los motores, ...
 
-            @property
-            def size(self):
-                return epuck._vision_sensor_params[1]
+    Las implementaciones de esta interfaz son: Epuck y VrepEPuck
+    '''
 
-            @property
-            def zoom(self):
-                return epuck._vision_sensor_params[2]
+    # Si es True, cada sensor se muestrea como mucho una vez entre dos invocaciones de update() (ver _read).
+    # Las implementaciones que reciben los valores de los sensores de forma asíncrona pueden establecerlo
+    # a False para obtener siempre el último valor
+    cache_readings = True
 
-            @property
-            def resample(self):
-                return epuck._vision_sensor_params[3]
+    # Tipo de sensor que muestrea cada método (ver set_max_age)
+    _getters_sensors = {
+        '_get_prox_sensor': 'prox_sensors',
+        '_get_prox_sensors': 'prox_sensors',
+        '_get_floor_sensor': 'floor_sensors',
+        '_get_floor_sensors': 'floor_sensors',
+        '_get_light_sensor': 'light_sensor',
+        '_get_vision_sensor': 'vision_sensor'
+    }
 
 
-            def set_params(self, *args, **kwargs):
-                epuck._set_vision_sensor_params(*args, **kwargs)
+    class Validators:
+        '''
+        Clase auxiliar para validar parámetros de algunos métodos de la clase EPuckInterface.
+        '''
 
-            @property
-            def params(self):
-                return (self.mode, self.size, self.zoom, self.resample)
+        @staticmethod
+        def validate_image_size(size):
+            '''
+            Valida el valor que establece las dimensiones de la imágen devuelta por el método
+            _get_vision_sensor_image
+            :param size:
+            :return:
+            '''
+            return isinstance(size, tuple) and len(size) == 2
 
-            @params.setter
-            def params(self, params):
-                self.set_params(*params)
+        @staticmethod
+        def validate_resample(resample):
+            '''
+            Valida el algoritmo de redimensionamiento de las imágenes del sensor de visión.
+            :param resample:
+            :return:
+            '''
+            return resample in (Image.BOX, Image.BILINEAR, Image.BICUBIC, Image.HAMMING, Image.LANCZOS, Image.NEAREST)
 
+        @staticmethod
+        def validate_value_in_range(a, b):
+            '''
+            Devuelve un método validador que sirve para comprobar si un valor está en intervalo indicado.
+            :param a: Extremo izquierdo del intervalo (inclusive)
+            :param b: Extremo derecho del intervalo (inclusive)
+            :return:
+            '''
+            return in_range(a, b)
 
-            def __str__(self):
-                return 'Vision sensor. Mode: {}, Dimensions: {}, Zoom: {}'.format(self.mode, self.size, self.zoom)
 
 
+    def __init__(self, asynch_update, *args, **kwargs):
+        '''
+        Inicializa esta instancia.
+        :param asynch_update: Indica si esta clase se engargará de mantener actualizados los valores
+        de los sensores y de modificar los parámetros de los actuadores de forma asíncrona o no.
+        Si este parámetro es False, deberá invocarse el método update() para obtener información actualizada
+        de los sensores del dispositivo y para hacer efectivos los cambios en los parámetros de los
+        actuadores.
+        :param args:
+        :param kwargs:
+        '''
         '''
         Constructor de clase. Inicializa la instancia.
         '''
-        self.left_motor = LeftMotor()
-        self.right_motor = RightMotor()
-        self.motors = CustomListFactory().create([self.left_motor, self.right_motor])
-        self.motors.add_global_property('speed', new_name = 'speeds')
+        self._subscriptions = []
+
+        self.left_motor = LeftMotor(self)
+        self.right_motor = RightMotor(self)
+        # Las velocidades de los motores pueden modificarse desde otro hilo (ver TrajectoryExecutor)
+        self._motors_lock = RLock()
+        self.motors = MotorGroup([self.left_motor, self.right_motor], push = self._set_motors_speeds, lock = self._motors_lock)
 
-        self.leds = CustomListFactory().create([Led(index) for index in range(0, 8)])
-        self.leds.add_global_property('state', new_name = 'states')
+        self.leds = LedGroup([Led(self, index) for index in range(0, 8)], push = self._set_leds_states)
 
-        self.prox_sensors = CustomListFactory().create([ProximitySensor(index) for index in range(0, 8)])
-        self.prox_sensors.add_global_property('value', new_name ='values')
-        self.prox_sensors.add_global_property('enabled')
+        self.prox_sensors = SensorGroup([ProximitySensor(self, index) for index in range(0, 8)], fetch = partial(self._read, self._get_prox_sensors),
+                                        subscribe = self._subscriptions.append)
         self.prox_sensor15, self.prox_sensor45, self.prox_sensor90 = self.prox_sensors[0:3]
         self.prox_sensor135, self.prox_sensor225 = self.prox_sensors[3:5]
         self.prox_sensor270, self.prox_sensor315, self.prox_sensor345 = self.prox_sensors[5:8]
 
-        self.vision_sensor = VisionSensor()
+        self.vision_sensor = VisionSensor(self)
         self.camera = self.vision_sensor
 
-        self.floor_sensors = CustomListFactory().create([FloorSensor(index) for index in ['left', 'middle', 'right']])
-        self.floor_sensors.add_global_property('value', new_name = 'values')
-        self.floor_sensors.add_global_property('enabled')
-        self.light_sensor = LightSensor()
+        self.floor_sensors = SensorGroup([FloorSensor(self, index) for index in ['left', 'middle', 'right']], fetch = partial(self._read, self._get_floor_sensors),
+                                         subscribe = self._subscriptions.append)
+        self.light_sensor = LightSensor(self)
+
+        self.sensors = SensorGroup(self.prox_sensors + self.floor_sensors + [self.vision_sensor, self.light_sensor])
+
+        self._vision_sensor_params = ('RGB', (40, 40), 1, NEAREST)
 
-        self.sensors = CustomListFactory().create(self.prox_sensors + self.floor_sensors + [self.vision_sensor, self.light_sensor])
-        self.sensors.add_global_property('enabled')
+        self.odometry = Odometry()
 
-        self._vision_sensor_params = ('RGB', (40, 40), 1, Image.NEAREST)
+        self.asynch_update = asynch_update
+        self._snapshot = None
+        self._update_timestamp = None
+        # Hilo que invocó update() por última vez
+        self._update_thread = None
+        self._readings = {}
+        self._max_ages = {}
+        self._acquired = {}
 
         self.alive = False
         self.args = args
@@ -398,6 +671,21 @@ class EPuckInterface:
         '''
         return self.alive
 
+    @classmethod
+    def set_trusted(cls, trusted = True):
+        '''
+        Activa o desactiva el modo "trusted". En este modo no se validan los parámetros de los métodos
+        (velocidad de los motores, estado de los leds, índices de los sensores, ...) ni se comprueba si el robot
+        está activo: se invocan directamente las implementaciones de los métodos. Es útil en bucles de control
+        con una frecuencia alta cuando los valores ya se han validado.
+        Afecta a todas las instancias de esta clase y de sus clases base.
+        e.g:
+        EPuck.set_trusted()
+        :param trusted: True para desactivar las comprobaciones, False para volver a activarlas
+        :return:
+        '''
+        epuck_validation.set_trusted(cls, trusted)
+
     @not_alive
     def __enter__(self):
         '''
@@ -447,7 +735,7 @@ class EPuckInterface:
         :return:
         '''
         # Desactivamos los leds y reseteamos la velocidad de los motores
-        self.leds.state = False
+        self.leds.states = False
         self.stop()
 
 
@@ -527,6 +815,40 @@ class EPuckInterface:
         self.motors.speeds = 0
 
 
+    @alive
+    @accepts(object, (int, float), (int, float))
+    def set_velocity(self, v, w):
+        '''
+        Modifica los parámetros de los motores del robot de forma que este se mueva a la velocidad lineal y
+        angular indicadas (modelo del uniciclo).
+        Si la velocidad de alguna de las ruedas supera el máximo, se reducen las dos en la misma proporción
+        para mantener la curvatura de la trayectoria.
+        :param v: Velocidad lineal en metros / segundo
+        :param w: Velocidad angular en radianes / segundo (en sentido antihorario)
+        :return:
+        '''
+        left, right = epuck_constraints.saturate_wheels_speeds(*epuck_constraints.wheels_speeds(v, w))
+        self.motors.speeds = (left, right)
+
+    @alive
+    def execute_trajectory(self, times, setpoints, kind = 'velocity', rate = 50, update_robot = False):
+        '''
+        Ejecuta una trayectoria en un hilo auxiliar (ver TrajectoryExecutor).
+        e.g:
+        executor = epuck.execute_trajectory([0, 2, 4], [(.05, 0), (0, 1), (0, 0)])
+        :param times: Instantes (en segundos desde el inicio) a partir de los cuales se aplica cada consigna
+        :param setpoints: Array de N x 2 con las consignas
+        :param kind: 'velocity' si las consignas son (v, w) o 'wheels' si son velocidades de las ruedas
+        :param rate: Número de veces por segundo que se envían las consignas a los motores
+        :param update_robot: Si es True, el hilo invoca update() después de cada consigna
+        :return: Devuelve la instancia de TrajectoryExecutor (ya iniciada). Su método cancel() detiene la
+        trayectoria y join() espera a que termine
+        '''
+        executor = TrajectoryExecutor(self, times, setpoints, kind = kind, rate = rate, update_robot = update_robot)
+        executor.start()
+        return executor
+
+
 
     @alive
     @accepts(object, Validators.validate_value_in_range(-epuck_constraints.max_motor_speed, epuck_constraints.max_motor_speed))
@@ -557,6 +879,19 @@ class EPuckInterface:
         pass
 
 
+    def _set_motors_speeds(self, indices, speeds):
+        '''
+        Establece la velocidad de varios motores a la vez. Las implementaciones pueden sobreescribir este
+        método para enviar todas las velocidades juntas.
+        :param indices: Lista de índices de los motores (0 para el motor izquierdo, 1 para el derecho)
+        :param speeds: Lista de velocidades en radianes / segundo
+        :return:
+        '''
+        setters = (self._set_left_motor_speed, self._set_right_motor_speed)
+        for index, speed in zip(indices, speeds):
+            setters[index](speed)
+
+
     '''
     Métodos para activar/desactivar los leds
     '''
@@ -571,6 +906,17 @@ class EPuckInterface:
         '''
         pass
 
+    def _set_leds_states(self, indices, states):
+        '''
+        Establece el estado de varios leds a la vez. Las implementaciones pueden sobreescribir este
+        método para enviar todos los estados juntos.
+        :param indices: Lista de índices de los leds
+        :param states: Lista de estados (valores booleanos)
+        :return:
+        '''
+        for index, state in zip(indices, states):
+            self._set_led_state(index, state)
+
 
 
     '''
@@ -589,8 +935,8 @@ class EPuckInterface:
 
     @alive
     @accepts(object, ('RGB', '1', 'L', 'P'), Validators.validate_image_size,
-             (1, 4, 8), (Image.BOX, Image.BILINEAR, Image.BICUBIC, Image.HAMMING, Image.LANCZOS, Image.NEAREST))
-    def _set_vision_sensor_params(self, mode = 'RGB', size = (40, 40), zoom = 1, resample = Image.NEAREST):
+             (1, 4, 8), Validators.validate_resample)
+    def _set_vision_sensor_params(self, mode = 'RGB', size = (40, 40), zoom = 1, resample = NEAREST):
         '''
         Modifica los parámetros del sensor de visión.
         :param mode: Puede ser el modo de la imágen (definidos por la librería PIL). Puede ser RGB, 1, L, P, ...
@@ -598,6 +944,8 @@ class EPuckInterface:
         white o escala de grises). En estos modos, se obtiene un rate de hasta ocho imágenes por segundo con una
         resolución de 40x40 píxeles.
         Para el resto de modos, puede alcanzarse un rate de 4 fps.
+        Por defecto se pide una imágen por segundo, para no retrasar la lectura del resto de sensores; para
+        obtener imágenes con mayor frecuencia debe indicarse su antigüedad máxima con set_max_age('vision_sensor', ...)
         Por defecto está en modo RGB
 
         :param size: Es el tamaño de la imágen deseado. En el robot físico, si por alguna razón no se puede obtener
@@ -612,6 +960,7 @@ class EPuckInterface:
         Por defecto es NEAREST (PIL.Image.NEAREST)
         '''
         self._vision_sensor_params = (mode, size, zoom, resample)
+        self._readings.pop(('_get_vision_sensor', ()), None)
 
     '''
     Métodos para muestrear los sensores de visión.
@@ -664,11 +1013,229 @@ class EPuckInterface:
         Después de invocar este método, la información de los sensores se actualizará.
         Además, los cambios en los parámetros de los actuadores se harán efectivos.
         Solo es necesario implementar este método en el caso de que se haya establecido el
-        parámetro async_update a False en el constructor de clase.
+        parámetro async_update a False en el constructor de clase. Las implementaciones deben invocar
+        el método _updated() cuando se hayan actualizado los sensores.
+        :return:
+        '''
+        self._update_thread = current_thread()
+
+    def _updated(self):
+        '''
+        Indica que la información de los sensores se ha actualizado. El siguiente snapshot se construye
+        con la nueva información.
+        :return:
+        '''
+        self._snapshot = None
+        self._update_timestamp = monotonic()
+
+        # Las lecturas de los sensores con antigüedad máxima se mantienen mientras no la superen
+        if self._max_ages:
+            self._readings = {key: reading for key, reading in self._readings.items()
+                              if self._getters_sensors.get(key[0]) in self._max_ages}
+        else:
+            self._readings.clear()
+
+        # Se notifican los cambios de los sensores
+        if self._subscriptions:
+            self._subscriptions = [subscription for subscription in self._subscriptions if subscription.active]
+            for subscription in self._subscriptions:
+                subscription.evaluate(self._update_timestamp)
+
+    def _read(self, getter, *args):
+        '''
+        Muestrea un sensor. Las lecturas se guardan hasta la siguiente invocación de update(), de forma que
+        cada sensor se muestrea como mucho una vez por paso aunque se consulte varias veces (por ejemplo, en
+        el controlador y en el streamer). No se guardan si el atributo cache_readings es False o si
+        no se ha invocado nunca update().
+        Si se ha establecido la antigüedad máxima del sensor (ver set_max_age), la lectura se guarda mientras
+        no la supere, independientemente de las invocaciones de update().
+        :param getter: Método que muestrea el sensor
+        :param args: Parámetros del método
+        :return: Devuelve el valor del sensor
+        '''
+        name = getter.__name__
+        sensor = self._getters_sensors.get(name)
+        max_age = self._max_ages.get(sensor)
+        if max_age is None and (not self.cache_readings or self._update_timestamp is None):
+            return self._fetch(getter, sensor, args)[0]
+
+        key = (name, args)
+        reading = self._readings.get(key)
+        if reading is None or (max_age is not None and monotonic() - reading[1] > max_age):
+            reading = self._readings[key] = self._fetch(getter, sensor, args)
+        return reading[0]
+
+    def _fetch(self, getter, sensor, args):
+        '''
+        Muestrea un sensor y registra el instante de adquisición de la lectura.
+        :return: Devuelve una tupla con el valor del sensor y el instante de adquisición
+        '''
+        value = getter(*args)
+        timestamp = self._get_reading_timestamp(sensor)
+        if sensor is not None:
+            self._acquired[sensor] = timestamp
+        return value, timestamp
+
+    def _get_reading_timestamp(self, sensor):
+        '''
+        Devuelve el instante (reloj monotónico) en el que se adquirió la última lectura de un tipo de sensor.
+        Por defecto, es el instante de la última invocación de update() si la actualización es síncrona o el
+        instante actual si es asíncrona. Las implementaciones que conocen el instante en el que el robot
+        adquiere las lecturas deben sobreescribir este método.
+        :param sensor: Tipo de sensor: 'prox_sensors', 'floor_sensors', 'light_sensor' o 'vision_sensor'
+        :return:
+        '''
+        if self.asynch_update or self._update_timestamp is None:
+            return monotonic()
+        return self._update_timestamp
+
+    def get_reading_timestamp(self, sensor):
+        '''
+        :param sensor: Tipo de sensor: 'prox_sensors', 'floor_sensors', 'light_sensor' o 'vision_sensor'
+        :return: Devuelve el instante (reloj monotónico) en el que se adquirió la última lectura del tipo de
+        sensor indicado o None si no se ha leído nunca
+        '''
+        return self._acquired.get(sensor)
+
+    def get_max_age(self, sensor):
+        '''
+        :param sensor: Tipo de sensor: 'prox_sensors', 'floor_sensors', 'light_sensor' o 'vision_sensor'
+        :return: Devuelve la antigüedad máxima de las lecturas del tipo de sensor indicado o None si no se ha
+        establecido
+        '''
+        return self._max_ages.get(sensor)
+
+    @alive
+    @accepts(object, ('prox_sensors', 'floor_sensors', 'light_sensor', 'vision_sensor'),
+             lambda max_age: max_age is None or (isinstance(max_age, (int, float)) and max_age >= 0))
+    def set_max_age(self, sensor, max_age):
+        '''
+        Establece la antigüedad máxima (en segundos) de las lecturas de un tipo de sensor. Mientras la última
+        lectura no la supere, se reutiliza sin volver a muestrear el sensor (aunque se invoque update()).
+        Cuando la supera, el sensor se muestrea de nuevo la siguiente vez que se consulta. Las implementaciones
+        también pueden usarla para muestrear el sensor con menos frecuencia (el robot físico solo pide al
+        firmware las lecturas que han caducado)
+        e.g:
+        epuck.set_max_age('vision_sensor', .5)
+        :param sensor: Tipo de sensor: 'prox_sensors', 'floor_sensors', 'light_sensor' o 'vision_sensor'
+        :param max_age: Antigüedad máxima en segundos. None para muestrear el sensor en cada paso
         :return:
         '''
+        if max_age is None:
+            self._max_ages.pop(sensor, None)
+        else:
+            self._max_ages[sensor] = max_age
+        self._set_max_age(sensor, max_age)
+
+    def _set_max_age(self, sensor, max_age):
+        '''
+        Las implementaciones pueden sobreescribir este método para muestrear el sensor indicado con menos
+        frecuencia (ver set_max_age)
+        '''
         pass
 
+    @alive
+    def snapshot(self):
+        '''
+        Devuelve el estado completo del robot en un único registro inmutable (Snapshot), con los campos:
+        - timestamp: Instante (reloj monotónico) de la última actualización
+        - prox_sensors: Tupla con los valores de los sensores de proximidad (None para los desactivados)
+        - floor_sensors: Tupla con los valores de los sensores de suelo izquierdo, central y derecho
+        (None para los desactivados)
+        - light_sensor: Valor del sensor de luz o None si está desactivado
+        - vision_sensor: Imagen del sensor de visión o None si está desactivado
+        - motors: Velocidades de los motores izquierdo y derecho
+        - leds: Tupla con el estado de los leds
+        - pose, velocity: Pose y velocidad estimadas por la odometría
+        - acquired: Instantes (reloj monotónico) en los que se adquirieron las lecturas de los sensores
+        (SensorTimestamps con los campos prox_sensors, floor_sensors, light_sensor y vision_sensor). None para
+        los sensores desactivados
+        El registro se construye una sola vez por cada invocación de update() (si la actualización es asíncrona,
+        se construye en cada invocación de este método)
+        :return:
+        '''
+        if self._snapshot is None or self.asynch_update:
+            self._snapshot = self._take_snapshot()
+        return self._snapshot
+
+    def _take_snapshot(self):
+        prox_enabled = [sensor.enabled for sensor in self.prox_sensors]
+        prox_values = self._read(self._get_prox_sensors) if any(prox_enabled) else None
+        prox_sensors = tuple(value if enabled else None for value, enabled in zip(prox_values or [None] * 8, prox_enabled))
+
+        floor_enabled = [sensor.enabled for sensor in self.floor_sensors]
+        floor_values = self._read(self._get_floor_sensors) if any(floor_enabled) else None
+        floor_sensors = tuple(value if enabled else None for value, enabled in zip(floor_values or [None] * 3, floor_enabled))
+
+        timestamp = self._update_timestamp
+        if timestamp is None or self.asynch_update:
+            timestamp = monotonic()
+
+        light_sensor = self._read(self._get_light_sensor) if self.light_sensor.enabled else None
+        vision_sensor = self._read(self._get_vision_sensor) if self.vision_sensor.enabled else None
+
+        acquired = self._acquired.get
+        return Snapshot(timestamp = timestamp,
+                        prox_sensors = prox_sensors,
+                        floor_sensors = floor_sensors,
+                        light_sensor = light_sensor,
+                        vision_sensor = vision_sensor,
+                        motors = (self.left_motor.speed, self.right_motor.speed),
+                        leds = tuple(led.state for led in self.leds),
+                        pose = self.odometry.pose,
+                        velocity = self.odometry.velocity,
+                        acquired = SensorTimestamps(prox_sensors = acquired('prox_sensors') if prox_values is not None else None,
+                                                    floor_sensors = acquired('floor_sensors') if floor_values is not None else None,
+                                                    light_sensor = acquired('light_sensor') if self.light_sensor.enabled else None,
+                                                    vision_sensor = acquired('vision_sensor') if self.vision_sensor.enabled else None))
+
+    def _get_prox_sensors(self):
+        '''
+        Muestrea todos los sensores de proximidad. Las implementaciones pueden sobreescribir este método
+        para obtener todos los valores a la vez.
+        :return: Devuelve una lista con los valores de los sensores de proximidad
+        '''
+        return [self._read(self._get_prox_sensor, index) for index in range(0, 8)]
+
+    def _get_floor_sensors(self):
+        '''
+        Muestrea todos los sensores de suelo. Las implementaciones pueden sobreescribir este método
+        para obtener todos los valores a la vez.
+        :return: Devuelve una lista con los valores de los sensores de suelo izquierdo, central y derecho
+        '''
+        return [self._read(self._get_floor_sensor, index) for index in ('left', 'middle', 'right')]
+
+
+    '''
+    Odometría
+    '''
+    @property
+    def pose(self):
+        '''
+        :return: Devuelve la pose estimada del robot como una tupla (x, y, theta): la posición en metros
+        respecto a la posición inicial (o la indicada en reset_pose) y la orientación en radianes.
+        Se actualiza en cada invocación de update()
+        '''
+        return self.odometry.pose
+
+    @property
+    def velocity(self):
+        '''
+        :return: Devuelve la velocidad estimada del robot como una tupla (v, w): la velocidad lineal en
+        metros / segundo y la velocidad angular en radianes / segundo
+        '''
+        return self.odometry.velocity
+
+    def reset_pose(self, x = 0, y = 0, theta = 0):
+        '''
+        Reestablece la pose estimada del robot.
+        :param x: Posición en el eje X en metros
+        :param y: Posición en el eje Y en metros
+        :param theta: Orientación en radianes
+        :return:
+        '''
+        self.odometry.reset(x, y, theta)
+
 
     '''
     Métodos para activar/desactivar los sensores
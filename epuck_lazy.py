@@ -0,0 +1,37 @@
+'''
+Este módulo permite importar módulos de forma diferida: el módulo se carga la primera vez que se accede a
+alguno de sus atributos. Se usa para las dependencias pesadas (NumPy, PIL), de forma que importar los
+módulos de pyepuck es rápido y solo se cargan las librerías que realmente se usan.
+e.g:
+np = lazy_import('numpy')
+'''
+
+import sys
+import importlib.util
+
+
+def lazy_import(name):
+    '''
+    Importa un módulo de forma diferida.
+    :param name: Nombre del módulo
+    :return: Devuelve el módulo. Se carga la primera vez que se accede a alguno de sus atributos. Si ya estaba
+    cargado, se devuelve directamente. Lanza la excepción ImportError si el módulo no existe
+    '''
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError('No module named {}'.format(name), name = name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    # Los submódulos se añaden como atributos del paquete, como en una importación normal
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
@@ -0,0 +1,145 @@
+'''
+Este módulo implementa la odometría del robot e-puck (modelo diferencial). La pose del robot se estima
+de forma incremental a partir de los contadores de pasos de los motores (sensor 'motor_position' del
+firmware) o, si no están disponibles, a partir de las velocidades de las ruedas.
+'''
+
+from math import sin, cos, pi
+from threading import Lock
+import epuck_constraints
+
+
+class Odometry:
+    '''
+    Estimación incremental de la pose (x, y, theta) y de la velocidad (lineal y angular) del robot.
+    Cada actualización tiene un coste constante. Puede actualizarse desde varios hilos a la vez (por ejemplo,
+    desde el controlador y desde un TrajectoryExecutor)
+    e.g:
+    odometry = Odometry()
+    while True:
+        driver.step()
+        odometry.update_steps(*driver.get_motor_position(), timestamp = driver.get_timestamp('motor_position'))
+        x, y, theta = odometry.pose
+    '''
+
+    def __init__(self, x = 0, y = 0, theta = 0, velocity_window = .1):
+        '''
+        Inicializa la instancia.
+        :param x: Posición inicial en el eje X (en metros)
+        :param y: Posición inicial en el eje Y (en metros)
+        :param theta: Orientación inicial en radianes
+        :param velocity_window: Intervalo mínimo de tiempo (en segundos) sobre el que se calcula la velocidad.
+        Las lecturas de los contadores de pasos son muy frecuentes y los desplazamientos entre dos lecturas
+        consecutivas muy pequeños, por lo que la velocidad se calcula con los desplazamientos acumulados.
+        Por defecto es 0.1
+        '''
+        self.velocity_window = velocity_window
+        self._lock = Lock()
+        self.reset(x, y, theta)
+
+    def reset(self, x = 0, y = 0, theta = 0):
+        '''
+        Reestablece la pose del robot. La siguiente lectura de los contadores de pasos se toma
+        como referencia.
+        '''
+        with self._lock:
+            self.x, self.y, self.theta = x, y, theta
+            self.v, self.w = 0, 0
+            self._window = [0, 0, 0]
+            self._steps = None
+            self._speeds = None
+            self._timestamp = None
+
+    @property
+    def pose(self):
+        '''
+        :return: Devuelve la pose del robot como una tupla (x, y, theta). Las coordenadas en metros y
+        la orientación en radianes, en el intervalo (-pi, pi]
+        '''
+        with self._lock:
+            return self.x, self.y, self.theta
+
+    @property
+    def velocity(self):
+        '''
+        :return: Devuelve la velocidad del robot como una tupla (v, w). La velocidad lineal en metros / segundo
+        y la velocidad angular en radianes / segundo
+        '''
+        with self._lock:
+            return self.v, self.w
+
+    def _move(self, left, right, dt):
+        '''
+        Actualiza la pose a partir del desplazamiento de cada rueda.
+        :param left: Desplazamiento (en metros) de la rueda izquierda
+        :param right: Desplazamiento (en metros) de la rueda derecha
+        :param dt: Tiempo transcurrido (en segundos) desde la última actualización
+        '''
+        ds = (left + right) / 2
+        dtheta = (right - left) / (2 * epuck_constraints.body_radius)
+
+        # Integramos con la orientación en el punto medio del desplazamiento
+        angle = self.theta + dtheta / 2
+        self.x += ds * cos(angle)
+        self.y += ds * sin(angle)
+        self.theta = (self.theta + dtheta + pi) % (2 * pi) - pi
+
+        # Desplazamiento y tiempo acumulados para calcular la velocidad
+        window = self._window
+        window[0] += ds
+        window[1] += dtheta
+        window[2] += dt
+        if window[2] >= self.velocity_window and window[2] > 0:
+            self.v = window[0] / window[2]
+            self.w = window[1] / window[2]
+            self._window = [0, 0, 0]
+
+    def update_steps(self, left, right, timestamp):
+        '''
+        Actualiza la pose a partir de los contadores de pasos de los motores. Se tiene en cuenta el
+        desbordamiento de los contadores (enteros de 16 bits), por lo que deben leerse al menos una vez
+        cada 32768 pasos (unos 30 segundos a la velocidad máxima)
+        :param left: Contador de pasos del motor izquierdo
+        :param right: Contador de pasos del motor derecho
+        :param timestamp: Instante en el que se adquirió la lectura (en segundos). Si es el mismo que el
+        de la anterior invocación (la lectura no se ha renovado), se ignora
+        '''
+        with self._lock:
+            if timestamp is None or timestamp == self._timestamp:
+                return
+
+            if self._steps is not None:
+                size = epuck_constraints.motor_steps_counter_size
+                last_left, last_right = self._steps
+                delta_left = (left - last_left + size // 2) % size - size // 2
+                delta_right = (right - last_right + size // 2) % size - size // 2
+
+                meters_per_step = epuck_constraints.wheels_radius / epuck_constraints.motor_steps_per_radian
+                self._move(delta_left * meters_per_step, delta_right * meters_per_step, timestamp - self._timestamp)
+
+            self._steps = left, right
+            self._timestamp = timestamp
+
+    def update_speeds(self, left, right, timestamp):
+        '''
+        Actualiza la pose a partir de las velocidades de las ruedas (cuando no se dispone de los contadores
+        de pasos de los motores). Debe invocarse cada vez que cambia la velocidad de los motores: se integran
+        las velocidades de la anterior invocación y se toman las indicadas para la siguiente.
+        :param left: Velocidad de la rueda izquierda en radianes / segundo a partir de este instante
+        :param right: Velocidad de la rueda derecha en radianes / segundo a partir de este instante
+        :param timestamp: Instante actual (en segundos)
+        '''
+        with self._lock:
+            if self._timestamp is not None:
+                dt = timestamp - self._timestamp
+                rw = epuck_constraints.wheels_radius
+                last_left, last_right = self._speeds
+                self._move(last_left * rw * dt, last_right * rw * dt, dt)
+            self._speeds = left, right
+            self._timestamp = timestamp
+
+    def __str__(self):
+        return 'Odometry. Pose: ({:.3f}, {:.3f}, {:.3f}), Velocity: ({:.3f}, {:.3f})'.format(*(self.pose + self.velocity))
+
+    def __repr__(self):
+        return self.__str__()
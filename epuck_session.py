@@ -0,0 +1,146 @@
+'''
+Este módulo define una capa de sesión sobre la clase EPuckDriver que restablece automáticamente la conexión
+con el robot cuando se pierde (por ejemplo, por una interferencia en el enlace bluetooth).
+e.g:
+session = EPuckSession(EPuckDriver(address))
+session.connect()
+session.enable('proximity')
+while True:
+    session.set_motors_speed(100, 100)
+    if session.step():
+        print(session.get_proximity())
+'''
+
+from threading import Thread, Lock
+from time import sleep
+from epuck_driver import STATE_ACTUATORS
+
+
+class EPuckSession:
+    '''
+    Envuelve una instancia de EPuckDriver. Si el método step() falla, se considera que se ha perdido la
+    conexión y se vuelve a conectar en segundo plano. Mientras tanto, step() no bloquea y devuelve False.
+    Al reconectar se restaura el estado del robot: los sensores activados y el modo del acelerómetro se
+    mantienen en el driver y se vuelven a enviar la velocidad de los motores, los leds y los parámetros
+    de la cámara.
+    El resto de métodos y atributos son los de EPuckDriver.
+    '''
+
+    def __init__(self, driver, retry_interval = .05, max_retry_interval = 2):
+        '''
+        Inicializa la instancia.
+        :param driver: Instancia de EPuckDriver. Su transporte debe poder volver a abrirse después de
+        cerrarse (como BluetoothTransport)
+        :param retry_interval: Tiempo de espera (en segundos) tras el primer intento fallido de reconexión.
+        Se duplica en cada intento
+        :param max_retry_interval: Tiempo de espera máximo entre dos intentos de reconexión
+        '''
+        self.driver = driver
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+
+        # Número de veces que se ha restablecido la conexión
+        self.reconnections = 0
+
+        self._lock = Lock()
+        self._connected = False
+        self._closed = False
+        self._thread = None
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    @property
+    def connected(self):
+        '''
+        :return: Devuelve True si hay conexión con el robot (False mientras se está reconectando)
+        '''
+        with self._lock:
+            return self._connected
+
+    def connect(self):
+        '''
+        Establece la conexión con el robot. Si no se puede establecer, se lanza una excepción (la
+        reconexión automática solo se hace si la conexión se pierde después)
+        :return:
+        '''
+        self.driver.connect()
+        with self._lock:
+            self._connected = True
+            self._closed = False
+        return True
+
+    def close(self):
+        '''
+        Cierra la conexión con el robot y detiene la reconexión, si está en curso.
+        :return:
+        '''
+        with self._lock:
+            self._closed = True
+            connected = self._connected
+            self._connected = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if connected:
+            return self.driver.close()
+
+    def disconnect(self):
+        return self.close()
+
+    def step(self):
+        '''
+        Igual que EPuckDriver.step(), pero no lanza una excepción si se pierde la conexión.
+        :return: Devuelve True si se han actualizado los sensores del robot, o False si se ha perdido la
+        conexión y se está reconectando o si se está recibiendo una imagen (los valores de los sensores
+        son los últimos leídos)
+        '''
+        if not self.connected:
+            return False
+        try:
+            return self.driver.step()
+        except Exception as e:
+            self._connection_lost(e)
+            return False
+
+    def _connection_lost(self, error):
+        self.driver._debug('Connection lost, reconnecting: ', error)
+
+        # Estado de los actuadores que hay que restaurar al reconectar (motores, leds y cámara). Los comandos
+        # que no establecen un estado (reproducir un sonido o fijar los contadores de pasos) no se repiten
+        written = {slot: command for slot, command in self.driver._actuators_written.items()
+                   if command[0] in STATE_ACTUATORS}
+
+        with self._lock:
+            self._connected = False
+        self._thread = Thread(target = self._reconnect, args = (written,), daemon = True)
+        self._thread.start()
+
+    def _reconnect(self, written):
+        driver = self.driver
+        interval = self.retry_interval
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+            try:
+                try:
+                    driver.transport.close()
+                except Exception:
+                    pass
+                driver.conexion_status = False
+                driver.connect()
+                break
+            except Exception as e:
+                driver._debug('Reconnection failed: ', e)
+                sleep(interval)
+                interval = min(interval * 2, self.max_retry_interval)
+
+        # Tras conectar, el robot se ha reiniciado. Se vuelven a enviar los actuadores en el siguiente step()
+        # (salvo los que se han modificado mientras se reconectaba)
+        for slot, command in written.items():
+            driver._actuators_to_write.setdefault(slot, command)
+
+        with self._lock:
+            self.reconnections += 1
+            self._connected = not self._closed
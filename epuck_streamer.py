@@ -9,7 +9,8 @@ import hashlib
 import struct
 from io import BytesIO
 from base64 import b64encode
-from PIL import Image
+from epuck_lazy import lazy_import
+Image = lazy_import('PIL.Image')
 
 class EPuckStreamer(Thread):
     '''
@@ -133,33 +134,36 @@ class EPuckStreamer(Thread):
             return self._data
 
     def broadcast(self):
-        def get_sensor_data(sensor):
-            return sensor.value if sensor.enabled else False
+        # Toda la información del robot se obtiene de una sola vez
+        snapshot = self.epuck.snapshot()
 
-        def get_sensors_data(sensors):
-            return [get_sensor_data(sensor) for sensor in sensors]
+        def get_sensor_data(value):
+            return value if value is not None else False
+
+        def get_sensors_data(values):
+            return [get_sensor_data(value) for value in values]
 
         def get_vision_sensor_data():
-            if not self.epuck.vision_sensor.enabled:
+            if snapshot.vision_sensor is None:
                 return False
             output = BytesIO()
             with output:
-                image = self.epuck.vision_sensor.value.transpose(Image.FLIP_TOP_BOTTOM)
+                image = snapshot.vision_sensor.transpose(Image.FLIP_TOP_BOTTOM)
                 image.save(output, format = 'jpeg')
                 data = b64encode(output.getvalue()).decode()
                 return data
 
         data = {
             # Información de sensores
-            'prox_sensors' : get_sensors_data(self.epuck.prox_sensors),
-            'floor_sensors' : get_sensors_data(self.epuck.floor_sensors),
+            'prox_sensors' : get_sensors_data(snapshot.prox_sensors),
+            'floor_sensors' : get_sensors_data(snapshot.floor_sensors),
             'vision_sensor' : get_vision_sensor_data(),
             'vision_sensor_params': self.epuck.vision_sensor.params,
-            'light_sensor' : get_sensor_data(self.epuck.light_sensor),
+            'light_sensor' : get_sensor_data(snapshot.light_sensor),
 
             # Información de actuadores
-            'leds' : self.epuck.leds.states,
-            'motors' : self.epuck.motors.speeds,
+            'leds' : list(snapshot.leds),
+            'motors' : list(snapshot.motors),
 
             # Información del controlador
             'elapsed_time' : self.controller.elapsed_time,
@@ -0,0 +1,157 @@
+'''
+Este módulo permite ejecutar trayectorias en el robot: una secuencia de consignas de velocidad, cada una
+con el instante (en segundos desde el inicio) a partir del cual se aplica. Las consignas pueden indicarse como
+velocidades del robot (v, w) o como velocidades de las ruedas.
+Todas las consignas se convierten a velocidades de las ruedas de una vez (con la cinemática de
+epuck_constraints) y se envían al robot desde un hilo a una frecuencia fija, independientemente de lo que
+tarde el método think() del controlador.
+e.g:
+times = np.linspace(0, 10, 101)
+setpoints = np.column_stack([np.full(101, .05), np.sin(times)])
+executor = epuck.execute_trajectory(times, setpoints, kind = 'velocity', rate = 50)
+...
+executor.join()
+'''
+
+from threading import Thread, Event
+from time import monotonic
+from epuck_lazy import lazy_import
+import epuck_constraints
+
+np = lazy_import('numpy')
+
+
+class TrajectoryExecutor(Thread):
+    '''
+    Hilo que envía las consignas de una trayectoria a los motores del robot a una frecuencia fija.
+    Las consignas se mantienen hasta el instante de la siguiente. La última consigna marca el final de
+    la trayectoria: se aplica en su instante y después se detiene el robot (si stop_at_end es True).
+    Si el hilo se retrasa (por ejemplo, si el robot tarda en actualizarse), se salta a la consigna que
+    corresponde al instante actual en vez de acumular el retraso.
+
+    Los cambios en los motores se hacen efectivos igual que si se modificaran desde el controlador:
+    inmediatamente si la actualización del robot es asíncrona o en la siguiente invocación de update().
+    Si no se usa un controlador, puede indicarse update_robot = True para que el propio hilo invoque
+    update() en cada paso. En ese caso, ningún otro hilo debe invocar update(): no se permite si el robot ya
+    se está actualizando desde otro hilo y, si otro hilo lo actualiza durante la trayectoria, la ejecución
+    se detiene con un error (ver el atributo error).
+    Las velocidades de los motores y la odometría pueden modificarse desde este hilo y desde el del
+    controlador a la vez.
+    '''
+
+    def __init__(self, epuck, times, setpoints, kind = 'velocity', rate = 50, update_robot = False, stop_at_end = True):
+        '''
+        Inicializa la instancia. El hilo no se inicia hasta que se invoca el método start()
+        :param epuck: Instancia de EPuckInterface
+        :param times: Instantes (en segundos desde el inicio de la trayectoria) a partir de los cuales se
+        aplica cada consigna. Deben estar en orden creciente
+        :param setpoints: Array de N x 2 con las consignas
+        :param kind: 'velocity' si las consignas son velocidades del robot (velocidad lineal en metros /
+        segundo y angular en radianes / segundo) o 'wheels' si son velocidades de las ruedas izquierda y derecha
+        en radianes / segundo. Las velocidades de las ruedas se limitan a epuck_constraints.max_motor_speed
+        manteniendo la curvatura de la trayectoria
+        :param rate: Número de veces por segundo que se envían las consignas a los motores. Por defecto es 50
+        :param update_robot: Si es True, se invoca el método update() del robot después de modificar los motores.
+        Se lanza una excepción si el robot ya se está actualizando desde otro hilo
+        :param stop_at_end: Si es True, se detiene el robot al terminar la trayectoria o al cancelarla
+        '''
+        super().__init__(daemon = True)
+
+        times = np.asarray(times, np.float64)
+        setpoints = np.asarray(setpoints, np.float64)
+        if times.ndim != 1 or len(times) == 0 or setpoints.shape != (len(times), 2):
+            raise ValueError('There must be a (N, 2) array of setpoints for N timestamps')
+        if np.any(np.diff(times) < 0):
+            raise ValueError('The timestamps of the setpoints must be sorted')
+        if rate <= 0:
+            raise ValueError('Invalid rate: {}'.format(rate))
+        if update_robot and self._updated_elsewhere(epuck):
+            raise ValueError('The robot is already being updated by another thread')
+
+        if kind == 'velocity':
+            left, right = epuck_constraints.wheels_speeds(setpoints[:, 0], setpoints[:, 1])
+        elif kind == 'wheels':
+            left, right = setpoints[:, 0], setpoints[:, 1]
+        else:
+            raise ValueError('Invalid kind of setpoints: {}'.format(kind))
+        speeds = np.column_stack(epuck_constraints.saturate_wheels_speeds(left, right))
+
+        # Consigna que corresponde a cada paso del hilo (el último paso es la última consigna)
+        steps = np.append(np.arange(0, times[-1], 1 / rate), times[-1])
+        indices = np.searchsorted(times, steps, side = 'right') - 1
+        self._steps = steps
+        self._speeds = speeds[np.maximum(indices, 0)]
+        self._speeds[indices < 0] = 0
+
+        self.epuck = epuck
+        self.rate = rate
+        self.update_robot = update_robot
+        self.stop_at_end = stop_at_end
+
+        self._cancelled = Event()
+        self.start_time = None
+        self.steps_sent = 0
+        self.steps_skipped = 0
+        self.error = None
+
+    @property
+    def duration(self):
+        '''
+        :return: Devuelve la duración de la trayectoria en segundos
+        '''
+        return self._steps[-1]
+
+    @property
+    def elapsed_time(self):
+        '''
+        :return: Devuelve el tiempo transcurrido desde el inicio de la trayectoria o None si no se ha iniciado
+        '''
+        return None if self.start_time is None else monotonic() - self.start_time
+
+    def _updated_elsewhere(self, epuck):
+        '''
+        :return: Devuelve True si el último hilo que ha invocado el método update() del robot es otro hilo
+        que sigue en ejecución
+        '''
+        thread = epuck._update_thread
+        return thread is not None and thread is not self and thread.is_alive()
+
+    def cancel(self):
+        '''
+        Detiene la ejecución de la trayectoria. El robot se detiene si stop_at_end es True.
+        :return:
+        '''
+        self._cancelled.set()
+
+    def run(self):
+        steps, speeds = self._steps, self._speeds
+        n = len(steps)
+        self.start_time = start = monotonic()
+        try:
+            index = 0
+            while index < n:
+                if self._cancelled.wait(start + steps[index] - monotonic()):
+                    break
+
+                self.epuck.motors.speeds = speeds[index]
+                if self.update_robot:
+                    if self._updated_elsewhere(self.epuck):
+                        raise Exception('The robot is being updated by another thread')
+                    self.epuck.update()
+                self.steps_sent += 1
+
+                # Si el hilo se ha retrasado, se salta a la consigna del instante actual (pero siempre se
+                # envía la última)
+                next_index = max(index + 1, int(np.searchsorted(steps, monotonic() - start, side = 'right')) - 1)
+                if next_index >= n and index < n - 1:
+                    next_index = n - 1
+                self.steps_skipped += next_index - index - 1
+                index = next_index
+
+        except Exception as e:
+            self.error = e
+        finally:
+            if self.stop_at_end and self.epuck.is_alive():
+                self.epuck.stop()
+                if self.update_robot and not self._updated_elsewhere(self.epuck):
+                    self.epuck.update()
@@ -0,0 +1,394 @@
+'''
+Este módulo define los transportes sobre los que se comunica la clase EPuckDriver con el firmware
+del robot e-puck. Un transporte es cualquier canal bidireccional de bytes (un socket RFCOMM, un extremo
+de un socketpair conectado a un emulador, ...)
+'''
+
+import struct
+import socket
+import errno
+import re
+from time import monotonic, sleep
+
+
+class Transport:
+    '''
+    Interfaz que deben implementar todos los transportes.
+    '''
+
+    def connect(self):
+        '''
+        Abre el canal de comunicación.
+        :return:
+        '''
+        raise NotImplementedError()
+
+    def close(self):
+        '''
+        Cierra el canal de comunicación.
+        :return:
+        '''
+        raise NotImplementedError()
+
+    def send(self, data):
+        '''
+        Envía datos por el canal.
+        :param data: Bytes a enviar
+        :return: Devuelve el número de bytes enviados.
+        '''
+        raise NotImplementedError()
+
+    def recv(self, n):
+        '''
+        Recibe datos del canal.
+        :param n: Número máximo de bytes a recibir
+        :return: Devuelve los bytes recibidos. Lanza una excepción (IOError) si hay un problema de
+        comunicación o se supera el tiempo de espera establecido.
+        '''
+        raise NotImplementedError()
+
+    def recv_into(self, buffer, n):
+        '''
+        Recibe datos del canal y los escribe directamente en el buffer indicado.
+        Por defecto se implementa usando el método recv(). Los transportes que lo soporten deben
+        sobreescribirlo para evitar copias intermedias.
+        :param buffer: Buffer en el que se escribirán los datos (memoryview, bytearray, ...)
+        :param n: Número máximo de bytes a recibir
+        :return: Devuelve el número de bytes recibidos.
+        '''
+        data = self.recv(n)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def settimeout(self, timeout):
+        '''
+        Establece el tiempo máximo de espera (en segundos) de las operaciones de lectura.
+        :param timeout:
+        :return:
+        '''
+        raise NotImplementedError()
+
+
+
+class SocketTransport(Transport):
+    '''
+    Transporte sobre un socket ya conectado (por ejemplo, uno de los extremos de socket.socketpair())
+    '''
+    def __init__(self, socket = None):
+        self.socket = socket
+
+    def connect(self):
+        # El socket ya está conectado
+        pass
+
+    def close(self):
+        self.socket.close()
+
+    def send(self, data):
+        return self.socket.send(data)
+
+    def recv(self, n):
+        return self.socket.recv(n)
+
+    def recv_into(self, buffer, n):
+        return self.socket.recv_into(buffer, n)
+
+    def settimeout(self, timeout):
+        self.socket.settimeout(timeout)
+
+
+
+class BluetoothTransport(SocketTransport):
+    '''
+    Transporte sobre una conexión bluetooth RFCOMM. Se usa la librería PyBluez o los sockets bluetooth
+    de la librería estándar (solo disponibles en Linux)
+    '''
+    def __init__(self, address, channel = 1, native = False):
+        '''
+        Inicializa la instancia.
+        :param address: Dirección MAC del robot en formato AA:BB:CC:DD:EE:FF
+        :param channel: Canal RFCOMM. Por defecto es 1
+        :param native: Si es True, se usan los sockets bluetooth de la librería estándar en vez de PyBluez.
+        Es necesario para poder usar el transporte con asyncio. Por defecto es False
+        '''
+        super().__init__()
+        self.address = address
+        self.channel = channel
+        self.native = native
+
+    def connect(self):
+        if self.native:
+            import socket
+            self.socket = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, socket.BTPROTO_RFCOMM)
+        else:
+            # Solo importamos PyBluez cuando es necesario, así el resto de transportes pueden
+            # usarse sin tener instalada esta librería.
+            import bluetooth
+            self.socket = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
+
+        self.socket.connect((self.address, self.channel))
+
+    def recv(self, n):
+        if self.native:
+            return super().recv(n)
+        try:
+            return self.socket.recv(n)
+        except IOError as e:
+            raise self._translate_error(e) from e
+
+    def recv_into(self, buffer, n):
+        if self.native:
+            return super().recv_into(buffer, n)
+        # Los sockets de PyBluez no implementan recv_into
+        return Transport.recv_into(self, buffer, n)
+
+    @staticmethod
+    def _translate_error(error):
+        '''
+        PyBluez lanza BluetoothError tanto si se supera el tiempo de espera como si no hay datos en modo
+        no bloqueante (EAGAIN). Se traducen a las excepciones de la librería estándar (socket.timeout y
+        BlockingIOError), para que puedan distinguirse de un error de comunicación
+        :param error: Excepción lanzada por PyBluez
+        :return: Devuelve la excepción equivalente o la propia excepción si es un error de comunicación
+        '''
+        if isinstance(error, (BlockingIOError, socket.timeout)):
+            return error
+        text = str(error)
+        if 'timed out' in text:
+            return socket.timeout(text)
+
+        # El código de error puede venir como atributo o al principio del mensaje, e.g: "(11, 'Resource temporarily unavailable')"
+        code = error.errno
+        if code is None:
+            match = re.match(r'\(?(\d+)', text)
+            code = int(match.group(1)) if match is not None else None
+        if code in (errno.EAGAIN, errno.EWOULDBLOCK):
+            return BlockingIOError(code, text)
+        return error
+
+
+
+'''
+Captura y reproducción de las comunicaciones.
+Un fichero de captura empieza con la cabecera CAPTURE_MAGIC, seguida de un registro por cada bloque de bytes
+enviado o recibido: el tiempo transcurrido desde el registro anterior (en microsegundos), el sentido y
+el tamaño del bloque (formato CAPTURE_RECORD) y a continuación los bytes del bloque. Las lecturas en las
+que no se recibió nada (se superó el tiempo de espera) se guardan como bloques recibidos vacíos.
+Cuando se restablece la conexión (por ejemplo, en una EPuckSession), la captura continúa en el mismo fichero
+con un registro vacío de tipo CAPTURE_RECONNECTED.
+'''
+
+CAPTURE_MAGIC = b'EPCAP\x01'
+CAPTURE_RECORD = struct.Struct('<IBH')
+CAPTURE_SENT = 0
+CAPTURE_RECEIVED = 1
+CAPTURE_RECONNECTED = 2
+
+
+def read_capture(file):
+    '''
+    Lee un fichero de captura.
+    :param file: Ruta del fichero o fichero abierto en modo binario
+    :return: Devuelve un generador de tuplas (tiempo, sentido, bytes). El tiempo está en segundos desde el
+    inicio de la captura y el sentido es CAPTURE_SENT, CAPTURE_RECEIVED o CAPTURE_RECONNECTED
+    '''
+    if isinstance(file, str):
+        with open(file, 'rb') as file:
+            yield from read_capture(file)
+        return
+
+    if file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+        raise ValueError('Not an e-puck capture file')
+    timestamp = 0
+    while True:
+        header = file.read(CAPTURE_RECORD.size)
+        if len(header) < CAPTURE_RECORD.size:
+            return
+        delta, direction, size = CAPTURE_RECORD.unpack(header)
+        timestamp += delta / 1000000
+        yield timestamp, direction, file.read(size)
+
+
+
+class RecordingTransport(Transport):
+    '''
+    Transporte que envuelve a otro y guarda en un fichero de captura todos los bytes enviados y recibidos,
+    junto con el instante (reloj monotónico) en el que se envían o reciben.
+    e.g:
+    driver = EPuckDriver(transport = RecordingTransport(BluetoothTransport(address), 'session.epcap'))
+    '''
+    def __init__(self, transport, path):
+        '''
+        Inicializa la instancia.
+        :param transport: Transporte que se usa para comunicarse con el robot
+        :param path: Ruta del fichero de captura. Se crea la primera vez que se abre el canal de comunicación,
+        si se vuelve a abrir (reconexiones), la captura continúa en el mismo fichero
+        '''
+        self.transport = transport
+        self.path = path
+        self._file = None
+        self._timestamp = None
+
+    def _record(self, direction, data):
+        now = monotonic()
+        delta = int(round((now - self._timestamp) * 1000000))
+        self._timestamp += delta / 1000000
+        for offset in range(0, max(len(data), 1), 0xFFFF):
+            chunk = data[offset:offset + 0xFFFF]
+            self._file.write(CAPTURE_RECORD.pack(delta, direction, len(chunk)))
+            self._file.write(chunk)
+            delta = 0
+
+    def connect(self):
+        self.transport.connect()
+        if self._timestamp is None:
+            self._file = open(self.path, 'wb')
+            self._file.write(CAPTURE_MAGIC)
+            self._timestamp = monotonic()
+        else:
+            # Reconexión: no se pierde lo capturado antes de que se cayera la conexión
+            if self._file is None:
+                self._file = open(self.path, 'ab')
+            self._record(CAPTURE_RECONNECTED, b'')
+
+    def close(self):
+        try:
+            self.transport.close()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def send(self, data):
+        n = self.transport.send(data)
+        self._record(CAPTURE_SENT, bytes(data[:n]))
+        return n
+
+    def recv(self, n):
+        try:
+            data = self.transport.recv(n)
+        except (BlockingIOError, TimeoutError, socket.timeout):
+            self._record(CAPTURE_RECEIVED, b'')
+            raise
+        if data:
+            self._record(CAPTURE_RECEIVED, data)
+        return data
+
+    def recv_into(self, buffer, n):
+        try:
+            n = self.transport.recv_into(buffer, n)
+        except (BlockingIOError, TimeoutError, socket.timeout):
+            self._record(CAPTURE_RECEIVED, b'')
+            raise
+        if n > 0:
+            self._record(CAPTURE_RECEIVED, bytes(buffer[:n]))
+        return n
+
+    def settimeout(self, timeout):
+        self.transport.settimeout(timeout)
+
+
+
+class ReplayTransport(Transport):
+    '''
+    Transporte que reproduce un fichero de captura (ver RecordingTransport) en lugar de comunicarse con un
+    robot. Los bytes enviados se descartan y los recibidos se entregan con los mismos tiempos de respuesta
+    que en la captura (o más rápido, según el parámetro speed). Si en la captura no se recibió respuesta
+    antes de la siguiente petición, se lanza un timeout, de forma que los reintentos se reproducen también.
+    El driver debe hacer las mismas peticiones que en la captura (mismos sensores y, si se usa la cámara,
+    camera_fps = float('inf') para que se pida una imagen en cada paso independientemente de la velocidad).
+    Si la conexión se restableció durante la captura, se reproduce también: se lanza un error de comunicación
+    en ese punto y la siguiente invocación de connect() continúa a partir de la reconexión.
+    e.g:
+    driver = EPuckDriver(transport = ReplayTransport('session.epcap', speed = float('inf')))
+    '''
+    def __init__(self, path, speed = 1):
+        '''
+        Inicializa la instancia.
+        :param path: Ruta del fichero de captura
+        :param speed: Velocidad de la reproducción respecto a la captura. Por defecto es 1 (tiempo real).
+        Puede ser float('inf') para entregar los datos sin esperas
+        '''
+        self.path = path
+        self.speed = speed
+        self._records = None
+        self._next = None
+        self._pending = b''
+        self._offset = 0
+        self._timeout = None
+
+    def _advance(self):
+        self._next = next(self._records, None)
+
+    def _due(self, timestamp):
+        # Instante (reloj monotónico) en el que deben entregarse los datos registrados en el tiempo indicado
+        return self._offset + timestamp / self.speed if self.speed != float('inf') else self._offset
+
+    def connect(self):
+        if self._records is None or self._next is None:
+            self._records = read_capture(self.path)
+            self._advance()
+        else:
+            # Reconexión: se continúa a partir del siguiente registro de reconexión de la captura
+            while self._next is not None and self._next[1] != CAPTURE_RECONNECTED:
+                self._advance()
+            if self._next is not None:
+                self._advance()
+        self._pending = b''
+        self._offset = monotonic() - (self._next[0] / self.speed if self._next is not None and self.speed != float('inf') else 0)
+
+    def close(self):
+        # La captura no se cierra, puede continuarse tras una reconexión (ver connect)
+        self._pending = b''
+
+    def _connection_lost(self):
+        if self._next is not None and self._next[1] == CAPTURE_RECONNECTED:
+            # En la captura se perdió la conexión en este punto
+            raise ConnectionResetError('Connection lost in the capture')
+
+    def send(self, data):
+        # Los datos recibidos en la captura antes de esta petición que aún no se han leído se entregan sin
+        # esperas (por ejemplo, el resto de una imagen que se está recibiendo cuando se envían los motores)
+        while self._next is not None and self._next[1] == CAPTURE_RECEIVED:
+            self._pending += self._next[2]
+            self._advance()
+        self._connection_lost()
+
+        if self._next is not None:
+            # Las respuestas se sincronizan con las peticiones, los tiempos de respuesta se mantienen
+            # aunque el procesamiento de las respuestas sea más lento o más rápido que en la captura
+            timestamp, direction, sent = self._next
+            self._offset = monotonic() - (timestamp / self.speed if self.speed != float('inf') else 0)
+            self._advance()
+        return len(data)
+
+    def recv(self, n):
+        if not self._pending:
+            if self._next is None:
+                # Fin de la captura
+                return b''
+            self._connection_lost()
+            timestamp, direction, data = self._next
+            if direction != CAPTURE_RECEIVED:
+                # En la captura no se recibió nada más antes de la siguiente petición
+                if self._timeout is not None:
+                    sleep(self._timeout)
+                raise TimeoutError('timed out')
+
+            wait = self._due(timestamp) - monotonic()
+            if self._timeout is not None and wait > self._timeout:
+                sleep(self._timeout)
+                raise TimeoutError('timed out')
+            if wait > 0:
+                sleep(wait)
+            self._advance()
+            if not data:
+                # En la captura se superó el tiempo de espera
+                raise TimeoutError('timed out')
+            self._pending = data
+
+        data, self._pending = self._pending[:n], self._pending[n:]
+        return data
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
@@ -0,0 +1,138 @@
+'''
+Este módulo implementa la validación de los parámetros de los métodos de la clase EPuckInterface y de sus
+implementaciones. Las comprobaciones se precalculan al decorar cada método (conjuntos de valores permitidos,
+tipos, intervalos, ...) para que su coste en cada invocación sea mínimo.
+Además, las comprobaciones pueden desactivarse por completo (modo "trusted"): los métodos decorados de una
+clase se sustituyen por sus implementaciones originales, de forma que no tienen ningún coste adicional.
+e.g:
+class Robot:
+    @accepts(object, in_range(-1, 1))
+    def move(self, speed):
+        ...
+
+set_trusted(Robot)
+'''
+
+
+class ArgumentValidationError(ValueError):
+    '''
+    Excepción que se lanza cuando el valor de un parámetro no es válido.
+    '''
+    pass
+
+
+def in_range(a, b):
+    '''
+    Devuelve un validador que comprueba si un valor está en el intervalo indicado.
+    :param a: Extremo izquierdo del intervalo (inclusive)
+    :param b: Extremo derecho del intervalo (inclusive)
+    :return:
+    '''
+    def validator(value):
+        return a <= value <= b
+    return validator
+
+
+def _compile(validator):
+    '''
+    Convierte la especificación de un validador en una función que recibe un valor y devuelve True si es
+    válido.
+    :param validator: Puede ser object (cualquier valor es válido), un tipo, una tupla de tipos, una tupla
+    o lista de valores permitidos o una función que reciba el valor y devuelva True si es válido
+    :return: Devuelve la función de validación o None si cualquier valor es válido
+    '''
+    if validator is object:
+        return None
+
+    if isinstance(validator, type):
+        return lambda value: isinstance(value, validator)
+
+    if isinstance(validator, (tuple, list)):
+        if all(isinstance(item, type) for item in validator):
+            types = tuple(validator)
+            return lambda value: isinstance(value, types)
+        try:
+            values = frozenset(validator)
+        except TypeError:
+            values = tuple(validator)
+
+        def validator(value):
+            try:
+                return value in values
+            except TypeError:
+                return False
+        return validator
+
+    if callable(validator):
+        return validator
+
+    raise TypeError('Invalid validator: {}'.format(validator))
+
+
+def accepts(*validators):
+    '''
+    Decorador que valida los parámetros posicionales de un método (se indica un validador por cada parámetro,
+    incluido self). Los parámetros indicados por su nombre también se validan. Se lanza la excepción
+    ArgumentValidationError si algún parámetro no es válido.
+    :param validators: Validadores de cada parámetro. Ver _compile()
+    :return:
+    '''
+    def decorator(method):
+        code = method.__code__
+        names = code.co_varnames[:code.co_argcount]
+        checks = [(index, names[index], check) for index, check in enumerate(map(_compile, validators))
+                  if check is not None and index < len(names)]
+
+        def checked_method(*args, **kwargs):
+            for index, name, check in checks:
+                if index < len(args):
+                    value = args[index]
+                elif name in kwargs:
+                    value = kwargs[name]
+                else:
+                    continue
+                if not check(value):
+                    raise ArgumentValidationError('Invalid value for the parameter "{}" of {}: {}'.format(name, method.__name__, value))
+            return method(*args, **kwargs)
+
+        return checked(checked_method, method)
+
+    return decorator
+
+
+def checked(checked_method, unchecked_method):
+    '''
+    Registra un método con comprobaciones (checked_method) como envoltorio de su implementación original
+    (unchecked_method), para que pueda ser sustituido en el modo "trusted". Lo usan los decoradores que
+    añaden comprobaciones a los métodos.
+    :return: Devuelve checked_method
+    '''
+    unchecked_method = getattr(unchecked_method, '__unchecked__', unchecked_method)
+    checked_method.__name__ = unchecked_method.__name__
+    checked_method.__doc__ = unchecked_method.__doc__
+    checked_method.__unchecked__ = unchecked_method
+    unchecked_method.__checked__ = checked_method
+    return checked_method
+
+
+def set_trusted(cls, trusted = True):
+    '''
+    Activa o desactiva el modo "trusted" en la clase indicada y en sus clases base. En este modo, los métodos
+    decorados con comprobaciones se sustituyen por sus implementaciones originales, por lo que los parámetros
+    no se validan. Afecta a todas las instancias de las clases.
+    :param cls: Clase
+    :param trusted: True para desactivar las comprobaciones, False para volver a activarlas
+    :return:
+    '''
+    for klass in cls.__mro__:
+        for name, method in list(vars(klass).items()):
+            replacement = getattr(method, '__unchecked__' if trusted else '__checked__', None)
+            if callable(replacement):
+                setattr(klass, name, replacement)
+
+
+def is_trusted(cls):
+    '''
+    :return: Devuelve True si la clase indicada tiene algún método en modo "trusted"
+    '''
+    return any(callable(getattr(method, '__checked__', None)) for klass in cls.__mro__ for method in vars(klass).values())
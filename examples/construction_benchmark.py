@@ -0,0 +1,44 @@
+'''
+Este ejemplo mide el tiempo de construcción y la memoria usada por cada instancia de EPuckInterface al
+crear 1000 robots (por ejemplo, para simular muchos robots a la vez). No se necesita un robot: se usa una
+implementación de EPuckInterface que no hace nada.
+'''
+
+from epuck_interface import EPuckInterface
+from time import perf_counter
+import tracemalloc
+import gc
+
+
+class DummyEPuck(EPuckInterface):
+    def __init__(self):
+        super().__init__(False)
+
+    def init(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def measure(count = 1000):
+    # El tiempo y la memoria se miden por separado (tracemalloc ralentiza la construcción)
+    gc.collect()
+    t0 = perf_counter()
+    robots = [DummyEPuck() for index in range(0, count)]
+    elapsed = perf_counter() - t0
+    del robots
+
+    gc.collect()
+    tracemalloc.start()
+    robots = [DummyEPuck() for index in range(0, count)]
+    memory, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / count, memory / count
+
+
+if __name__ == '__main__':
+    # La primera medición incluye la inicialización de las clases y de NumPy
+    measure(10)
+    elapsed, memory = measure()
+    print('1000 robots. Construction time: {:.1f} us / robot, memory: {:.1f} KiB / robot'.format(elapsed * 1e6, memory / 1024))
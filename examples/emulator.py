@@ -0,0 +1,32 @@
+'''
+Este ejemplo mide el número de pasos por segundo que puede ejecutar la clase EPuckDriver sobre el
+emulador del firmware del e-puck (no se necesita un robot físico). Se simula un enlace bluetooth con
+la latencia y el ancho de banda indicados.
+'''
+
+from epuck_driver import EPuckDriver
+from epuck_emulator import EPuckEmulator
+from time import monotonic
+
+
+def measure(pipelined, baudrate = 115200, latency = .01, duration = 3):
+    emulator = EPuckEmulator(baudrate = baudrate, latency = latency)
+    driver = EPuckDriver(transport = emulator.transport, pipelined = pipelined)
+    driver.connect()
+    try:
+        driver.enable('proximity', 'floor', 'light', 'motor_position', 'motor_speed')
+        steps = 0
+        t0 = monotonic()
+        while monotonic() - t0 < duration:
+            driver.set_motors_speed(100, -100)
+            driver.step()
+            steps += 1
+        return steps / (monotonic() - t0)
+    finally:
+        driver.close()
+        emulator.close()
+
+
+if __name__ == '__main__':
+    for pipelined in (False, True):
+        print('Pipelined: {}, steps / sec: {:.1f}'.format(pipelined, measure(pipelined)))
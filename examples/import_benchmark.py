@@ -0,0 +1,55 @@
+'''
+Este ejemplo mide el tiempo que se tarda en importar las clases de pyepuck (python -X importtime) y
+comprueba que no supera un presupuesto fijo. Las dependencias pesadas (PIL, NumPy, PyBluez, el cliente de
+V-rep) se importan de forma diferida, por lo que no deben contar en este tiempo.
+Devuelve un código de error si se supera el presupuesto, así que puede usarse en scripts de integración.
+e.g:
+python examples/import_benchmark.py --budget 30
+'''
+
+from argparse import ArgumentParser
+import subprocess
+import sys
+import os
+
+
+STATEMENT = 'from pyepuck import EPuckInterface, EPuck, VRepEPuck, EPuckController, EPuckDriver, EPuckFleet'
+
+
+def import_times(statement):
+    '''
+    Ejecuta la instrucción indicada en un nuevo intérprete con la opción -X importtime.
+    :return: Devuelve un diccionario con el tiempo (en microsegundos) de cada módulo importado, sin
+    incluir el de sus submódulos
+    '''
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH = os.pathsep.join([root] + os.environ.get('PYTHONPATH', '').split(os.pathsep)))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], env = env,
+                            stderr = subprocess.PIPE, universal_newlines = True, check = True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(self_time)
+    return times
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description = 'Import time of pyepuck')
+    parser.add_argument('--budget', type = float, default = 30, help = 'Maximum import time in milliseconds')
+    args = parser.parse_args()
+
+    # Los módulos que se importan al iniciar el intérprete no cuentan
+    baseline = import_times('pass')
+    times = dict((name, time) for name, time in import_times(STATEMENT).items() if name not in baseline)
+    total = sum(times.values()) / 1000
+
+    for name, time in sorted(times.items(), key = lambda item: -item[1])[:10]:
+        print('{:<30} {:8.2f} ms'.format(name, time / 1000))
+    print('Total: {:.2f} ms, budget: {:.2f} ms'.format(total, args.budget))
+
+    heavy = [name for name in ('numpy', 'PIL.Image', 'bluetooth', 'vrep') if name in times]
+    if heavy:
+        print('Heavy modules imported eagerly: {}'.format(', '.join(heavy)))
+    sys.exit(1 if total > args.budget or heavy else 0)
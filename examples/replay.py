@@ -0,0 +1,46 @@
+'''
+Este ejemplo graba una sesión de EPuckDriver con el emulador del firmware del e-puck y después la
+reproduce sin esperas con ReplayTransport. La reproducción no depende del enlace, por lo que sirve para
+medir el coste de decodificar las respuestas y del bucle de control sin un robot.
+No se activa la cámara: mientras se recibe una imagen, step() no lee el resto de sensores.
+'''
+
+from epuck_driver import EPuckDriver
+from epuck_emulator import EPuckEmulator
+from epuck_transport import ReplayTransport
+from tempfile import TemporaryDirectory
+from time import monotonic
+import os
+
+
+def run(driver, steps):
+    driver.connect()
+    try:
+        driver.enable('proximity', 'floor', 'light', 'motor_position', 'motor_speed')
+        t0 = monotonic()
+        updates = 0
+        for step in range(0, steps):
+            driver.set_motors_speed(100, -100)
+            if driver.step():
+                updates += 1
+        return updates / (monotonic() - t0)
+    finally:
+        driver.close()
+
+
+if __name__ == '__main__':
+    steps = 100
+
+    with TemporaryDirectory() as directory:
+        capture = os.path.join(directory, 'session.epcap')
+
+        emulator = EPuckEmulator(latency = .01)
+        rate = run(EPuckDriver(transport = emulator.transport, capture = capture), steps)
+        emulator.close()
+        print('Recorded, sensor updates / sec: {:.1f}'.format(rate))
+
+        rate = run(EPuckDriver(transport = ReplayTransport(capture)), steps)
+        print('Replayed in real time, sensor updates / sec: {:.1f}'.format(rate))
+
+        rate = run(EPuckDriver(transport = ReplayTransport(capture, speed = float('inf'))), steps)
+        print('Replayed without waits, sensor updates / sec: {:.1f}'.format(rate))
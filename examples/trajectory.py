@@ -0,0 +1,37 @@
+'''
+Ejemplo que demuestra como ejecutar una trayectoria en el robot e-puck.
+El robot describe un ocho durante 20 seg: las consignas de velocidad (v, w) se calculan de una vez y
+se envían a los motores desde un hilo a 50 Hz, mientras el controlador sigue ejecutándose.
+'''
+
+import numpy as np
+from epuck_controller import EPuckController
+from epuck import EPuck as PhysicalEPuck
+from vrep_epuck import VRepEPuck as VirtualEPuck
+
+
+class TrajectoryExampleController(EPuckController):
+    def init(self):
+        times = np.linspace(0, 20, 201)
+        v = np.full(len(times), .05)
+        w = 1.2 * np.sin(2 * np.pi * times / 20)
+        self.executor = self.epuck.execute_trajectory(times, np.column_stack([v, w]), kind = 'velocity', rate = 50)
+
+    def close(self):
+        self.executor.cancel()
+        print('Trajectory finished. Steps sent: {}, skipped: {}'.format(self.executor.steps_sent, self.executor.steps_skipped))
+
+    def think(self):
+        if not self.executor.is_alive():
+            raise StopIteration()
+
+    def act(self):
+        pass
+
+
+if __name__ == '__main__':
+    epuck = VirtualEPuck(address = '127.0.0.1:19997')
+    # epuck = PhysicalEPuck()
+
+    controller = TrajectoryExampleController(epuck)
+    controller.run()
@@ -0,0 +1,55 @@
+'''
+Este ejemplo mide el coste por invocación de los métodos de EPuckInterface más usados en los bucles de
+control (velocidad de los motores, estado de los leds y lectura de los sensores de proximidad) con la
+validación de parámetros activada y en el modo "trusted". No se necesita un robot: se usa una
+implementación de EPuckInterface que no hace nada.
+'''
+
+from epuck_interface import EPuckInterface
+from timeit import timeit
+
+
+class DummyEPuck(EPuckInterface):
+    def __init__(self):
+        super().__init__(False)
+
+    def init(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _set_left_motor_speed(self, speed):
+        super()._set_left_motor_speed(speed)
+
+    def _set_led_state(self, index, state):
+        super()._set_led_state(index, state)
+
+    def _get_prox_sensor(self, index):
+        super()._get_prox_sensor(index)
+        return 0
+
+
+def measure(epuck, number = 200000):
+    left_motor, led, prox_sensor = epuck.left_motor, epuck.leds[0], epuck.prox_sensor15
+    statements = {
+        'left_motor.speed = 1': lambda: setattr(left_motor, 'speed', 1),
+        'led.state = True': lambda: setattr(led, 'state', True),
+        'prox_sensor.value': lambda: prox_sensor.value
+    }
+    return dict((name, timeit(statement, number = number) / number) for name, statement in statements.items())
+
+
+if __name__ == '__main__':
+    epuck = DummyEPuck()
+    epuck.live()
+    epuck.prox_sensors.enabled = True
+
+    checked = measure(epuck)
+    DummyEPuck.set_trusted()
+    trusted = measure(epuck)
+    DummyEPuck.set_trusted(False)
+
+    for name in checked:
+        print('{:<24} checked: {:6.3f} us, trusted: {:6.3f} us, saved: {:6.3f} us / call'.format(
+            name, checked[name] * 1e6, trusted[name] * 1e6, (checked[name] - trusted[name]) * 1e6))
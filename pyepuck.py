@@ -0,0 +1,54 @@
+'''
+Punto de entrada de la librería pyepuck. Da acceso a todas las clases de la librería, pero cada módulo
+(y sus dependencias: PyBluez, el cliente de V-rep, PIL, NumPy, ...) solo se importa la primera vez que
+se usa alguna de sus clases. Así, un controlador que solo usa el simulador no necesita tener instalada
+la librería PyBluez, y viceversa.
+e.g:
+from pyepuck import VRepEPuck, EPuckController
+'''
+
+from importlib import import_module
+
+
+# Módulo en el que se define cada uno de los nombres exportados
+_exports = {
+    'EPuckInterface': 'epuck_interface',
+    'Snapshot': 'epuck_interface',
+    'SensorTimestamps': 'epuck_interface',
+    'EPuck': 'epuck',
+    'VRepEPuck': 'vrep_epuck',
+    'EPuckController': 'epuck_controller',
+    'EPuckStreamer': 'epuck_streamer',
+    'EPuckDriver': 'epuck_driver',
+    'AsyncEPuckDriver': 'epuck_async_driver',
+    'EPuckSession': 'epuck_session',
+    'EPuckFleet': 'epuck_fleet',
+    'EPuckEmulator': 'epuck_emulator',
+    'Odometry': 'epuck_odometry',
+    'TrajectoryExecutor': 'epuck_trajectory',
+    'DiscoveryCache': 'epuck_discovery',
+    'Transport': 'epuck_transport',
+    'SocketTransport': 'epuck_transport',
+    'BluetoothTransport': 'epuck_transport',
+    'RecordingTransport': 'epuck_transport',
+    'ReplayTransport': 'epuck_transport',
+    'constraints': 'epuck_constraints'
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    module_name = _exports.get(name)
+    if module_name is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    module = import_module(module_name)
+    value = module if module_name == 'epuck_constraints' else getattr(module, name)
+
+    # Las siguientes consultas no pasan por esta función
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
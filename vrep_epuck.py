@@ -1,10 +1,9 @@
 
-from epuck_interface import EPuckInterface
-from PIL import Image
-from vrep import Client as VRepClient
-from pyvalid import accepts
+from epuck_interface import EPuckInterface, NEAREST
+from epuck_validation import accepts
 from random import random
 from math import pi
+from time import monotonic
 import epuck_constraints
 
 class VRepEPuck(EPuckInterface):
@@ -30,6 +29,8 @@ class VRepEPuck(EPuckInterface):
     '''
 
     def init(self, address, comm_thread_cycle):
+        # El cliente de V-rep solo se importa cuando se usa el simulador
+        from vrep import Client as VRepClient
         self.client = VRepClient(address, comm_thread_cycle)
         self.simulation = self.client.simulation
 
@@ -51,11 +52,28 @@ class VRepEPuck(EPuckInterface):
     def _set_left_motor_speed(self, speed):
         super()._set_left_motor_speed(speed)
         self.handler.left_motor.speed = speed
+        # Los motores del simulador no proporcionan contadores de pasos. La odometría se estima a partir
+        # de las velocidades de los motores
+        self.odometry.update_speeds(speed, self.right_motor.speed, monotonic())
 
 
     def _set_right_motor_speed(self, speed):
         super()._set_right_motor_speed(speed)
         self.handler.right_motor.speed = speed
+        self.odometry.update_speeds(self.left_motor.speed, speed, monotonic())
+
+
+    def _set_motors_speeds(self, indices, speeds):
+        # Se modifican todos los motores y después se actualiza la odometría una sola vez, con las
+        # nuevas velocidades de ambos motores
+        setters = (super()._set_left_motor_speed, super()._set_right_motor_speed)
+        handlers = (self.handler.left_motor, self.handler.right_motor)
+        new_speeds = [self.left_motor.speed, self.right_motor.speed]
+        for index, speed in zip(indices, speeds):
+            setters[index](speed)
+            handlers[index].speed = speed
+            new_speeds[index] = speed
+        self.odometry.update_speeds(*new_speeds, monotonic())
 
 
     '''
@@ -82,7 +100,7 @@ class VRepEPuck(EPuckInterface):
     '''
     Implementación del método para muestrear el sensor de visión
     '''
-    def _set_vision_sensor_params(self, mode = 'RGB', size = (40, 40), zoom = 1, resample = Image.NEAREST):
+    def _set_vision_sensor_params(self, mode = 'RGB', size = (40, 40), zoom = 1, resample = NEAREST):
         super()._set_vision_sensor_params(mode, size, zoom, resample)
 
 
@@ -112,6 +130,17 @@ class VRepEPuck(EPuckInterface):
 
 
 
+    '''
+    Actualiza la odometría (los sensores y actuadores se actualizan de forma asíncrona)
+    '''
+    def update(self):
+        super().update()
+        # Las velocidades pueden modificarse a la vez desde otro hilo (ver TrajectoryExecutor)
+        with self._motors_lock:
+            self.odometry.update_speeds(self.left_motor.speed, self.right_motor.speed, monotonic())
+        self._updated()
+
+
     '''
     Activación / Desactivación de sensores
     '''